@@ -0,0 +1,242 @@
+import multiprocessing as mp
+import queue
+import threading
+import time
+from concurrent.futures import TimeoutError as FutureTimeout
+
+from face_track import FaceTrack
+from frame_preprocessing import resize_for_analysis
+from resource_manager import configure_frameworks
+
+# Inputs an analyzer can declare
+FRAMES = "frames"
+AUDIO = "audio"
+TRANSCRIPT = "transcript"
+
+PROGRESS_EVERY = 15  # frames between progress callbacks
+HEARTBEAT_SECONDS = 0.5  # progress callbacks while waiting on a single long framework call
+
+
+class AnalysisCancelled(Exception):
+    pass
+
+
+class CancellationToken:
+    # Checked by every analysis loop; cancel() from any thread stops the run at the
+    # next frame, and the runner's cleanup closes MediaPipe graphs and capture handles
+    def __init__(self, timeout_seconds=None):
+        self._event = threading.Event()
+        self.deadline = time.monotonic() + timeout_seconds if timeout_seconds else None
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self):
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            self._event.set()
+        return self._event.is_set()
+
+    def raise_if_cancelled(self):
+        if self.cancelled:
+            raise AnalysisCancelled("Analysis was cancelled.")
+
+
+def check_cancelled(cancel_token):
+    if cancel_token is not None:
+        cancel_token.raise_if_cancelled()
+
+
+def report_progress(progress_callback, stage, done, total):
+    # progress_callback(stage, done, total); total is 0 when it isn't known
+    if progress_callback is not None:
+        progress_callback(stage, done, total)
+
+
+def wait_with_progress(future, progress_callback, stage, done=0, total=0, cancel_token=None):
+    # A UI can only stop a run while its progress callback is being called, so keep
+    # calling it while a long job (one Whisper chunk) runs on another thread
+    while True:
+        check_cancelled(cancel_token)
+        report_progress(progress_callback, stage, done, total)
+        try:
+            return future.result(timeout=HEARTBEAT_SECONDS)
+        except FutureTimeout:
+            pass
+
+
+def _process_main(fn, args, kwargs, messages, forward_progress):
+    def send_progress(stage, done, total):
+        messages.put(("progress", (stage, done, total)))
+
+    try:
+        if forward_progress:
+            kwargs = dict(kwargs, progress_callback=send_progress)
+        messages.put(("result", fn(*args, **kwargs)))
+    except Exception as e:
+        messages.put(("error", repr(e)))
+
+
+def run_in_process(fn, args=(), kwargs=None, progress_callback=None, stage=None, cancel_token=None,
+                   forward_progress=False):
+    # Runs fn(*args, **kwargs) in a child process so a stage made of long framework calls
+    # (transcription, audio extraction, the LLM request) can really be stopped: however
+    # this wait ends, cancellation, an error or the UI interrupting it from the progress
+    # callback, the child is terminated. fn and its arguments must be picklable. With
+    # `forward_progress`, fn gets a progress_callback that reports back to this one.
+    ctx = mp.get_context("spawn")
+    messages = ctx.Queue()
+    process = ctx.Process(target=_process_main, args=(fn, args, kwargs or {}, messages, forward_progress),
+                          daemon=True)
+    process.start()
+    progress = (stage, 0, 0)
+    exited = False
+    try:
+        while True:
+            check_cancelled(cancel_token)
+            report_progress(progress_callback, *progress)
+            try:
+                kind, value = messages.get(timeout=HEARTBEAT_SECONDS)
+            except queue.Empty:
+                if process.is_alive():
+                    continue
+                # A child puts its result before exiting; give it one more poll to arrive
+                if exited:
+                    raise RuntimeError(f"The {stage} process exited with code {process.exitcode}.")
+                exited = True
+                continue
+            if kind == "progress":
+                progress = value
+            elif kind == "result":
+                return value
+            else:
+                raise RuntimeError(f"{stage} failed: {value}")
+    finally:
+        if process.is_alive():
+            process.terminate()
+        process.join()
+        messages.close()
+        messages.cancel_join_thread()
+
+
+class Analyzer:
+    # Common interface for every metric. The runner decodes the video once and calls
+    # update() on each frame analyzer every `frame_step` frames with the downscaled BGR
+    # frame (and its RGB conversion when `needs_rgb` is set). Audio and transcript
+    # analyzers do all of their work in finalize(). close() must release any
+    # framework resources and is always called, even when the run fails.
+    name = None
+    result_key = None
+    inputs = ()
+    frame_step = 1
+    needs_rgb = False
+
+    def start(self, context):
+        pass
+
+    def update(self, frame_index, frame, rgb_frame):
+        pass
+
+    def finalize(self, context):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+def is_due(analyzer, frame_index):
+    # Same frames the trackers picked with CAP_PROP_POS_FRAMES % frame_skip == 0
+    return (frame_index + 1) % analyzer.frame_step == 0
+
+
+def run_analyzers(analyzers, video_path=None, audio_path=None, transcription=None, face_track=None,
+                  progress_callback=None, cancel_token=None, timings=None, threads=None):
+    # Returns {analyzer.result_key: result}. When a `timings` dict is passed it is filled
+    # with wall-clock seconds per analyzer plus "decode" for the shared frame loop.
+    # `threads` overrides the job's share of the cores (see resource_manager).
+    import cv2
+
+    if timings is None:
+        timings = {}
+    for analyzer in analyzers:
+        timings[analyzer.name] = 0.0
+
+    owns_track = face_track is None
+    if owns_track:
+        face_track = FaceTrack()
+
+    context = {
+        "video_path": video_path,
+        "audio_path": audio_path,
+        "transcription": transcription,
+        "face_track": face_track,
+        "progress_callback": progress_callback,
+        "cancel_token": cancel_token,
+    }
+
+    frame_analyzers = [a for a in analyzers if FRAMES in a.inputs]
+    cap = None
+    results = {}
+
+    try:
+        if frame_analyzers:
+            cap = cv2.VideoCapture(video_path)
+            context["fps"] = cap.get(cv2.CAP_PROP_FPS) or 30
+            context["frame_count"] = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+
+        for analyzer in analyzers:
+            check_cancelled(cancel_token)
+            started = time.perf_counter()
+            analyzer.start(context)
+            timings[analyzer.name] += time.perf_counter() - started
+        # Analyzers take turns on this thread, so each framework gets the job's whole share
+        configure_frameworks(threads)
+
+        if frame_analyzers:
+            frame_index = 0
+            frame_count = context["frame_count"]
+            timings["decode"] = 0.0
+            while cap.isOpened():
+                check_cancelled(cancel_token)
+                if frame_index % PROGRESS_EVERY == 0:
+                    report_progress(progress_callback, "frames", frame_index, frame_count)
+                # grab() decodes without converting; frames no analyzer wants are never retrieved
+                started = time.perf_counter()
+                if not cap.grab():
+                    break
+                due = [a for a in frame_analyzers if is_due(a, frame_index)]
+                if due:
+                    success, frame = cap.retrieve()
+                    if not success:
+                        break
+                    frame = resize_for_analysis(frame)
+                    rgb_frame = None
+                    if any(a.needs_rgb for a in due):
+                        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                    timings["decode"] += time.perf_counter() - started
+                    for analyzer in due:
+                        started = time.perf_counter()
+                        analyzer.update(frame_index, frame, rgb_frame)
+                        timings[analyzer.name] += time.perf_counter() - started
+                else:
+                    timings["decode"] += time.perf_counter() - started
+                frame_index += 1
+            context["frames_decoded"] = frame_index
+            report_progress(progress_callback, "frames", frame_index, max(frame_count, frame_index))
+
+        for done, analyzer in enumerate(analyzers):
+            check_cancelled(cancel_token)
+            report_progress(progress_callback, analyzer.name, done, len(analyzers))
+            started = time.perf_counter()
+            results[analyzer.result_key] = analyzer.finalize(context)
+            timings[analyzer.name] += time.perf_counter() - started
+        report_progress(progress_callback, "finalize", len(analyzers), len(analyzers))
+    finally:
+        if cap is not None:
+            cap.release()
+        for analyzer in analyzers:
+            analyzer.close()
+        if owns_track:
+            face_track.close()
+
+    return results
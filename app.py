@@ -1,17 +1,32 @@
 import streamlit as st
-from exactly_one_face import calculate_red_flag_percentage
-from eye_gaze_tracker import calculate_attention_percentage
-from emotion_tracker import calculate_emotion_percentages
-from gesture_posture_tracker import GesturePostureTracker
-from pitch_variation_tracker import calculate_pitch_variation_percentages
+from analyzers import AnalysisCancelled, CancellationToken, run_in_process
+from exactly_one_face import screen_red_flag_percentage
+from pipeline import ANALYZER_REGISTRY, load_pipeline_config, run_pipeline
+from proxy import PROXY_CACHE_DIR, PROXY_ENABLED, PROXY_FPS, PROXY_HEIGHT, adapt_pipeline_config, make_proxy, probe_video
+from transcription import extract_audio, transcribe_audio, BACKENDS, MODEL_SIZES, TRANSCRIBE_BACKEND, WHISPER_MODEL_SIZE
 from llm_feedback import generate_llm_feedback
+from results_store import save_results
+
+from resource_manager import configure_process
+from warmup import PREWARM, start_prewarm
 
 import tempfile
 import os
 import json
+import time
+
+# Hard limit for a single analysis; unset means no limit
+ANALYSIS_TIMEOUT_SECONDS = float(os.getenv("ANALYSIS_TIMEOUT_SECONDS", "0")) or None
 
 st.set_page_config(page_title="Student Video Analyzer", layout="centered")
 
+# Thread pools have to be sized before TensorFlow/PyTorch/OpenCV are imported
+configure_process()
+
+# Analyzer modules load their frameworks lazily; start importing them while the page renders
+if PREWARM:
+    start_prewarm()
+
 st.title("🎓 Student Video Analyzer")
 st.write("Upload a student presentation video. This tool will automatically detect:")
 st.markdown("""
@@ -20,13 +35,55 @@ st.markdown("""
 - 😊 Emotion distribution
 - 🧍‍♂️ Posture and gestures
 - 🎙️ Pitch tone variation
+- ⏱️ Speech rate, pauses and filler words
 - 📝 Transcript with timestamps
 - 🤖 LLM Feedback & Score
 """)
 
-uploaded_file = st.file_uploader("Upload a video file (e.g., .mp4)", type=["mp4", "mov", "avi", "mkv"])
+st.sidebar.header("Transcription")
+transcribe_backend = st.sidebar.selectbox("Backend", BACKENDS, index=BACKENDS.index(TRANSCRIBE_BACKEND))
+whisper_model_size = st.sidebar.selectbox("Whisper model size", MODEL_SIZES, index=MODEL_SIZES.index(WHISPER_MODEL_SIZE))
+
+pipeline_config = load_pipeline_config()
+
+st.sidebar.header("Analyzers")
+for analyzer_name in ANALYZER_REGISTRY:
+    pipeline_config[analyzer_name]["enabled"] = st.sidebar.checkbox(
+        analyzer_name.replace("_", " ").capitalize(), value=pipeline_config[analyzer_name]["enabled"])
+
+st.sidebar.header("Video Decoding")
+use_proxy = st.sidebar.checkbox(
+    f"Fast analysis on a {PROXY_HEIGHT}p / {PROXY_FPS} fps proxy", value=PROXY_ENABLED,
+    help="Transcode the upload once to a small, seek-friendly copy and run every frame analyzer on it.")
+
+st.sidebar.header("Results")
+cohort = st.sidebar.text_input("Course / cohort", value="", help="Stored with the results for cohort reports.")
+
+st.sidebar.header("Red Flag Detection")
+quick_screening = st.sidebar.checkbox(
+    "Quick screening", value=False,
+    help="Sample frames sparsely and only run the full face mesh where the face count changes.")
+
 
-if uploaded_file is not None:
+def cancel_analysis():
+    # Callbacks run at the start of the rerun the click triggers, after Streamlit has
+    # already stopped the previous run at its next st.* call. Every long stage calls
+    # update_progress() regularly, so that happens within about a second; the flag
+    # keeps the new run from starting the analysis over.
+    st.session_state["analysis_cancelled"] = True
+
+
+def reset_cancellation():
+    st.session_state["analysis_cancelled"] = False
+
+
+uploaded_file = st.file_uploader("Upload a video file (e.g., .mp4)", type=["mp4", "mov", "avi", "mkv"],
+                                 on_change=reset_cancellation)
+
+if uploaded_file is not None and st.session_state.get("analysis_cancelled"):
+    st.warning("⏹️ Analysis cancelled. Upload the video again to restart it.")
+
+elif uploaded_file is not None:
     with tempfile.NamedTemporaryFile(delete=False, suffix=".mp4") as tmp:
         tmp.write(uploaded_file.read())
         temp_video_path = tmp.name
@@ -35,23 +92,43 @@ if uploaded_file is not None:
     st.video(temp_video_path)
     st.info("⏳ Processing video... This might take a while.")
 
-    audio_path = temp_video_path.replace(".mp4", "_audio.wav")
+    # Only enforces ANALYSIS_TIMEOUT_SECONDS; the Cancel button works through the rerun
+    cancel_token = CancellationToken(timeout_seconds=ANALYSIS_TIMEOUT_SECONDS)
+    st.button("⏹️ Cancel analysis", on_click=cancel_analysis)
+    progress_bar = st.progress(0.0, text="Starting analysis...")
 
-    if not os.path.exists(audio_path):
-        from moviepy import VideoFileClip
-        print("[DEBUG] Extracting audio...")
-        video = VideoFileClip(temp_video_path)
-        video.audio.write_audiofile(audio_path)
-        video.close()
-        print("[DEBUG] Audio extracted successfully.")
+    def update_progress(stage, done, total):
+        fraction = min(done / total, 1.0) if total else 0.0
+        progress_bar.progress(fraction, text=f"{stage.replace('_', ' ').capitalize()}: {done}/{total or '?'}")
+
+    audio_path = temp_video_path.replace(".mp4", "_audio.wav")
 
     result_data = {}
+    stage_timings = {}
+    analysis_video_path = temp_video_path
 
     try:
-        import whisper_timestamped as whisper
-        print("[DEBUG] Loading Whisper model...")
-        model = whisper.load_model("base")
-        transcription_result = whisper.transcribe(model, audio_path)
+        if not os.path.exists(audio_path):
+            print("[DEBUG] Extracting audio...")
+            run_in_process(extract_audio, (temp_video_path, audio_path), progress_callback=update_progress,
+                           stage="audio", cancel_token=cancel_token)
+            print("[DEBUG] Audio extracted successfully.")
+
+        if use_proxy:
+            stage_started = time.perf_counter()
+            analysis_video_path = make_proxy(
+                temp_video_path, progress_callback=update_progress, cancel_token=cancel_token)
+            adapt_pipeline_config(pipeline_config, probe_video(temp_video_path)[0])
+            stage_timings["proxy"] = time.perf_counter() - stage_started
+
+        stage_started = time.perf_counter()
+        print(f"[DEBUG] Transcribing with {transcribe_backend} ({whisper_model_size})...")
+        # In a child process, so leaving or cancelling stops the chunk that is running
+        transcription_result = run_in_process(
+            transcribe_audio, (audio_path,), {"backend": transcribe_backend, "model_size": whisper_model_size},
+            progress_callback=update_progress, stage="transcription", cancel_token=cancel_token,
+            forward_progress=True)
+        stage_timings["transcription"] = time.perf_counter() - stage_started
         print("[DEBUG] Transcription completed.")
 
         transcript_data = []
@@ -68,50 +145,92 @@ if uploaded_file is not None:
             json.dump(transcript_data, f, ensure_ascii=False, indent=4)
         print("[DEBUG] Transcript saved.")
 
-        red_flag_percent = calculate_red_flag_percentage(temp_video_path)
-        result_data["red_flag_percentage"] = red_flag_percent
-        st.subheader("🚨 Red Flag Detection (Face Count)")
-        st.success(f"Red flag percentage: {red_flag_percent:.2f}%")
-        if red_flag_percent > 0:
-            st.warning("⚠️ Some frames had no face or multiple faces.")
-        else:
-            st.success("✅ Perfect! Exactly one face was detected in all frames.")
-
-        attention_percent = calculate_attention_percentage(temp_video_path)
-        result_data["attention_percentage"] = attention_percent
-        st.subheader("🧠 Attention Detection (Eye Gaze)")
-        st.success(f"Attention percentage: {attention_percent:.2f}%")
-        if attention_percent > 75:
-            st.success("✅ Excellent attention!")
-        elif attention_percent > 40:
-            st.warning("⚠️ Moderate attention. Some distractions detected.")
-        else:
-            st.error("🚨 Low attention. The student looked away too often.")
-
-        emotion_percentages = calculate_emotion_percentages(temp_video_path)
-        result_data["emotion_distribution"] = emotion_percentages
-        st.subheader("😊 Emotion Distribution")
-        st.bar_chart(emotion_percentages)
-        for emotion, percent in emotion_percentages.items():
-            st.write(f"**{emotion.capitalize()}**: {percent:.2f}%")
-
-        tracker = GesturePostureTracker()
-        gesture_posture_percentages = tracker.calculate_posture_gesture_percentages(temp_video_path)
-        result_data["gesture_posture_distribution"] = gesture_posture_percentages
-        st.subheader("🧍‍♂️ Body Gesture & Posture")
-        st.bar_chart(gesture_posture_percentages)
-        for label, percent in gesture_posture_percentages.items():
-            st.write(f"**{label}**: {percent:.2f}%")
-
-        pitch_categories = calculate_pitch_variation_percentages(audio_path)
-        result_data["pitch_variation_distribution"] = pitch_categories
-        st.subheader("🎙️ Pitch Tone Variation (Voice Modulation)")
-        if "Error" in pitch_categories:
-            st.error(f"Error in pitch analysis: {pitch_categories['Error']}")
-        else:
-            st.bar_chart(pitch_categories)
-            for tone, percent in pitch_categories.items():
-                st.write(f"**{tone}**: {percent:.2f}%")
+        # Quick screening replaces the dense red-flag analyzer rather than running alongside it
+        run_quick_screening = quick_screening and pipeline_config["red_flag"]["enabled"]
+        if run_quick_screening:
+            pipeline_config["red_flag"]["enabled"] = False
+
+        # All enabled analyzers share a single decode of the video
+        result_data.update(run_pipeline(
+            pipeline_config, analysis_video_path, audio_path, transcription_result,
+            progress_callback=update_progress, cancel_token=cancel_token, timings=stage_timings))
+
+        if run_quick_screening:
+            stage_started = time.perf_counter()
+            screening = screen_red_flag_percentage(
+                analysis_video_path, progress_callback=update_progress, cancel_token=cancel_token)
+            result_data["red_flag_screening"] = screening
+            result_data["red_flag_percentage"] = screening["red_flag_percentage"]
+            stage_timings["red_flag_screening"] = time.perf_counter() - stage_started
+
+        if "red_flag_percentage" in result_data:
+            red_flag_percent = result_data["red_flag_percentage"]
+            st.subheader("🚨 Red Flag Detection (Face Count)")
+            if "red_flag_screening" in result_data:
+                screening = result_data["red_flag_screening"]
+                st.success(
+                    f"Red flag percentage: {red_flag_percent:.2f}% "
+                    f"(at most {screening['upper_bound_percentage']:.2f}% with {screening['confidence']:.0%} confidence)"
+                )
+            else:
+                st.success(f"Red flag percentage: {red_flag_percent:.2f}%")
+            if red_flag_percent > 0:
+                st.warning("⚠️ Some frames had no face or multiple faces.")
+            else:
+                st.success("✅ Perfect! Exactly one face was detected in all frames.")
+
+        if "attention_percentage" in result_data:
+            attention_percent = result_data["attention_percentage"]
+            st.subheader("🧠 Attention Detection (Eye Gaze)")
+            st.success(f"Attention percentage: {attention_percent:.2f}%")
+            if attention_percent > 75:
+                st.success("✅ Excellent attention!")
+            elif attention_percent > 40:
+                st.warning("⚠️ Moderate attention. Some distractions detected.")
+            else:
+                st.error("🚨 Low attention. The student looked away too often.")
+
+        if "emotion_distribution" in result_data:
+            emotion_percentages = result_data["emotion_distribution"]
+            st.subheader("😊 Emotion Distribution")
+            st.bar_chart(emotion_percentages)
+            for emotion, percent in emotion_percentages.items():
+                st.write(f"**{emotion.capitalize()}**: {percent:.2f}%")
+
+        if "gesture_posture_distribution" in result_data:
+            gesture_posture_percentages = result_data["gesture_posture_distribution"]
+            st.subheader("🧍‍♂️ Body Gesture & Posture")
+            st.bar_chart(gesture_posture_percentages)
+            for label, percent in gesture_posture_percentages.items():
+                st.write(f"**{label}**: {percent:.2f}%")
+
+        if "pitch_variation_distribution" in result_data:
+            pitch_categories = result_data["pitch_variation_distribution"]
+            st.subheader("🎙️ Pitch Tone Variation (Voice Modulation)")
+            if "Error" in pitch_categories:
+                st.error(f"Error in pitch analysis: {pitch_categories['Error']}")
+            else:
+                st.bar_chart(pitch_categories)
+                for tone, percent in pitch_categories.items():
+                    st.write(f"**{tone}**: {percent:.2f}%")
+
+        if "vocal_metrics" in result_data:
+            vocal_metrics = result_data["vocal_metrics"]
+            st.subheader("🎵 Vocal Metrics")
+            st.write(f"**Median pitch**: {vocal_metrics['median_pitch_hz']:.1f} Hz")
+            st.write(f"**Pitch range (5th–95th percentile)**: {vocal_metrics['pitch_range_hz']:.1f} Hz")
+            st.write(f"**Pitch variability**: {vocal_metrics['pitch_std_semitones']:.2f} semitones")
+            st.write(f"**Pitch trend**: {vocal_metrics['pitch_trend_semitones_per_min']:+.3f} semitones/min")
+            st.write(f"**Voiced ratio**: {vocal_metrics['voiced_ratio']:.0%}")
+
+        if "speech_metrics" in result_data:
+            speech_metrics = result_data["speech_metrics"]
+            st.subheader("⏱️ Speech Rate, Pauses & Fillers")
+            st.write(f"**Speech rate**: {speech_metrics['speech_rate_wpm']:.1f} wpm")
+            st.write(f"**Long pauses (>1.5s)**: {speech_metrics['long_pause_count']}")
+            st.write(f"**Filler words**: {speech_metrics['filler_word_count']}")
+            st.write(f"**Possible fillers (like, kind of, sort of)**: {speech_metrics['possible_filler_count']}")
+            st.write(f"**Word repetition**: {speech_metrics['word_repetition_percentage']:.2f}%")
 
         result_data["transcript"] = transcript_data
         st.subheader("📝 Transcript with Timestamps")
@@ -122,14 +241,16 @@ if uploaded_file is not None:
         with open(result_json_path, "w", encoding="utf-8") as f:
             json.dump(result_data, f, ensure_ascii=False, indent=4)
 
+        progress_bar.progress(1.0, text="Analysis complete")
         st.success("✅ Analysis complete. Summary saved to `results_summary.json`.")
 
         st.subheader("🤖 LLM Feedback")
 
-        llm_feedback = generate_llm_feedback(
-            metrics_path=result_json_path,
-            transcript_path=transcript_path
-        )
+        stage_started = time.perf_counter()
+        llm_feedback = run_in_process(
+            generate_llm_feedback, kwargs={"metrics_path": result_json_path, "transcript_path": transcript_path},
+            progress_callback=update_progress, stage="llm_feedback", cancel_token=cancel_token)
+        stage_timings["llm_feedback"] = time.perf_counter() - stage_started
 
         # llm_feedback is already a dict (parsed JSON), so pass directly to st.json
         if isinstance(llm_feedback, dict):
@@ -141,16 +262,32 @@ if uploaded_file is not None:
             # If not dict (unlikely), fallback to text area
             st.text_area("LLM Feedback & Scoring", value=str(llm_feedback), height=500)
 
+        video_id = save_results(
+            result_data,
+            stage_timings=stage_timings,
+            llm_feedback=llm_feedback if isinstance(llm_feedback, dict) else None,
+            filename=uploaded_file.name,
+            cohort=cohort or None,
+        )
+        print(f"[DEBUG] Results stored with id {video_id}.")
+
+    except AnalysisCancelled:
+        print("[DEBUG] Analysis cancelled.")
+        st.warning("⏹️ Analysis cancelled.")
     except Exception as e:
         print(f"[ERROR] Exception during processing: {e}")
         st.error(f"❌ Error processing video: {e}")
-
-    try:
-        print("[DEBUG] Cleaning up temp files...")
-        os.remove(temp_video_path)
-        if os.path.exists(audio_path):
-            os.remove(audio_path)
-        print("[DEBUG] Cleanup complete.")
-    except Exception as cleanup_error:
-        print(f"[WARNING] Cleanup error: {cleanup_error}")
-        st.warning(f"⚠️ Cleanup warning: {cleanup_error}")
+    finally:
+        # Also runs when Streamlit stops the script because the user left or reran it
+        try:
+            print("[DEBUG] Cleaning up temp files...")
+            os.remove(temp_video_path)
+            if os.path.exists(audio_path):
+                os.remove(audio_path)
+            # Proxies in PROXY_CACHE_DIR outlive the upload; ones next to it go with it
+            if analysis_video_path != temp_video_path and not PROXY_CACHE_DIR and os.path.exists(analysis_video_path):
+                os.remove(analysis_video_path)
+            print("[DEBUG] Cleanup complete.")
+        except Exception as cleanup_error:
+            print(f"[WARNING] Cleanup error: {cleanup_error}")
+            st.warning(f"⚠️ Cleanup warning: {cleanup_error}")
@@ -0,0 +1,57 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULES = [
+    "exactly_one_face",
+    "eye_gaze_tracker",
+    "emotion_tracker",
+    "gesture_posture_tracker",
+    "pitch_variation_tracker",
+    "speech_metrics",
+    "transcription",
+    "llm_feedback",
+    "cv2",
+    "mediapipe",
+    "deepface.DeepFace",
+    "librosa",
+    "crepe",
+    "torch",
+    "whisper_timestamped",
+]
+
+SNIPPET = "import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+
+
+def time_import(module):
+    # Fresh interpreter each run so nothing is already in sys.modules
+    result = subprocess.run(
+        [sys.executable, "-c", SNIPPET.format(module=module)],
+        cwd=REPO_ROOT, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        return None
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold import time of the analyzer modules.")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("modules", nargs="*", default=MODULES)
+    args = parser.parse_args()
+
+    print(f"{'module':<28}{'median (s)':>12}{'min (s)':>10}")
+    for module in args.modules:
+        times = [time_import(module) for _ in range(args.repeat)]
+        if any(t is None for t in times):
+            print(f"{module:<28}{'import failed':>22}")
+            continue
+        print(f"{module:<28}{statistics.median(times):>12.3f}{min(times):>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+import argparse
+import multiprocessing as mp
+import os
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from resource_manager import available_cores  # noqa: E402
+
+
+def workload(threads, video_path, audio_path, barrier, results):
+    # One analysis job: the real pipeline (MediaPipe, DeepFace, and CREPE when audio is
+    # given) with its frameworks sized to `threads`. Set before anything heavy is imported.
+    from resource_manager import THREAD_ENV_VARS, configure_frameworks
+    for name in THREAD_ENV_VARS:
+        os.environ[name] = str(threads)
+    os.environ["TF_NUM_INTEROP_THREADS"] = str(max(1, min(threads, 2)))
+
+    from analyzers import AUDIO, TRANSCRIPT
+    from pipeline import ANALYZER_REGISTRY, load_pipeline_config, run_pipeline
+    config = load_pipeline_config()
+    for name, analyzer_cls in ANALYZER_REGISTRY.items():
+        if TRANSCRIPT in analyzer_cls.inputs or (audio_path is None and AUDIO in analyzer_cls.inputs):
+            config[name]["enabled"] = False
+
+    # Framework start-up isn't what the thread count changes; keep it out of the timing
+    from warmup import prewarm
+    prewarm()
+    configure_frameworks(threads)
+
+    barrier.wait()
+    start = time.perf_counter()
+    # run_analyzers() resizes the pools again once the analyzers have started
+    run_pipeline(config, video_path, audio_path=audio_path, threads=threads)
+    results.put(time.perf_counter() - start)
+
+
+def run_config(concurrency, threads, video_path, audio_path):
+    ctx = mp.get_context("spawn")
+    barrier = ctx.Barrier(concurrency)
+    results = ctx.Queue()
+    procs = [ctx.Process(target=workload, args=(threads, video_path, audio_path, barrier, results))
+             for _ in range(concurrency)]
+    for p in procs:
+        p.start()
+    durations = [results.get() for _ in procs]
+    for p in procs:
+        p.join()
+    # Slowest job decides when a parallel run is done
+    return max(durations)
+
+
+def candidate_threads(cores, concurrency):
+    # Powers of two up to the core count, plus the even share resource_manager would pick
+    candidates = {cores, max(1, cores // concurrency)}
+    threads = 1
+    while threads < cores:
+        candidates.add(threads)
+        threads *= 2
+    return sorted(candidates)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Time the analysis pipeline with different per-job thread counts to find the one "
+                    "that avoids oversubscription on this machine.")
+    parser.add_argument("video", help="Video to analyze; use a short representative clip.")
+    parser.add_argument("--audio", help="Extracted audio to include the CREPE stages.")
+    parser.add_argument("--concurrency", type=int, nargs="*", default=[1, 2, 4],
+                        help="Numbers of analysis jobs running at the same time.")
+    args = parser.parse_args()
+
+    cores = available_cores()
+    print(f"Available cores: {cores}")
+    print(f"{'jobs':>5}{'threads/job':>13}{'slowest job (s)':>18}")
+
+    for concurrency in args.concurrency:
+        timings = {}
+        for threads in candidate_threads(cores, concurrency):
+            timings[threads] = run_config(concurrency, threads, args.video, args.audio)
+            print(f"{concurrency:>5}{threads:>13}{timings[threads]:>18.3f}")
+        best = min(timings, key=timings.get)
+        print(f"  best for {concurrency} concurrent job(s): {best} thread(s) per job")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,45 +1,54 @@
-import cv2
-from deepface import DeepFace
 from collections import Counter
+from analyzers import Analyzer, FRAMES, run_analyzers
+from face_track import FaceTrack, crop_face
 
-def calculate_emotion_percentages(video_path: str, frame_skip: int = 10) -> dict:
-    cap = cv2.VideoCapture(video_path)
+ALL_EMOTIONS = ['angry', 'disgust', 'fear', 'happy', 'sad', 'surprise', 'neutral']
 
-    emotion_counts = Counter()
-    total_processed = 0
 
-    # Initialize all 7 emotions to 0
-    all_emotions = ['angry', 'disgust', 'fear', 'happy', 'sad', 'surprise', 'neutral']
-    for emotion in all_emotions:
-        emotion_counts[emotion] = 0
+class EmotionAnalyzer(Analyzer):
+    name = "emotion"
+    result_key = "emotion_distribution"
+    inputs = (FRAMES,)
 
-    while cap.isOpened():
-        success, frame = cap.read()
-        if not success:
-            break
+    def __init__(self, frame_step: int = 10):
+        self.frame_step = frame_step
 
-        frame_id = int(cap.get(cv2.CAP_PROP_POS_FRAMES))
-        if frame_id % frame_skip != 0:
-            continue
+    def start(self, context):
+        from deepface import DeepFace  # pulls in TensorFlow, so only load it when needed
+        self.deepface = DeepFace
+        self.face_track = context["face_track"]
 
+        # Initialize all 7 emotions to 0
+        self.emotion_counts = Counter({emotion: 0 for emotion in ALL_EMOTIONS})
+        self.total_processed = 0
+
+    def update(self, frame_index, frame, rgb_frame):
         try:
-            analysis = DeepFace.analyze(frame, actions=['emotion'], enforce_detection=False)
+            box = self.face_track.box_for(frame_index, frame)
+            if box is not None:
+                # Face already located, skip DeepFace's own detector
+                analysis = self.deepface.analyze(crop_face(frame, box), actions=['emotion'],
+                                                 detector_backend='skip', enforce_detection=False)
+            else:
+                analysis = self.deepface.analyze(frame, actions=['emotion'], enforce_detection=False)
             dominant_emotion = analysis[0]['dominant_emotion']
-            if dominant_emotion in emotion_counts:
-                emotion_counts[dominant_emotion] += 1
-            total_processed += 1
+            if dominant_emotion in self.emotion_counts:
+                self.emotion_counts[dominant_emotion] += 1
+            self.total_processed += 1
         except Exception:
-            continue
+            pass
 
-    cap.release()
+    def finalize(self, context):
+        if self.total_processed == 0:
+            return {emotion: 0.0 for emotion in ALL_EMOTIONS}
 
-    if total_processed == 0:
-        return {emotion: 0.0 for emotion in all_emotions}
+        # Convert to percentage
+        return {
+            emotion: round((count / self.total_processed) * 100, 2)
+            for emotion, count in self.emotion_counts.items()
+        }
 
-    # Convert to percentage
-    emotion_percentages = {
-        emotion: round((count / total_processed) * 100, 2)
-        for emotion, count in emotion_counts.items()
-    }
 
-    return emotion_percentages
+def calculate_emotion_percentages(video_path: str, frame_skip: int = 10, face_track: FaceTrack = None) -> dict:
+    results = run_analyzers([EmotionAnalyzer(frame_step=frame_skip)], video_path=video_path, face_track=face_track)
+    return results["emotion_distribution"]
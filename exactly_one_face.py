@@ -1,28 +1,24 @@
-import cv2
-import mediapipe as mp
+from analyzers import Analyzer, FRAMES, PROGRESS_EVERY, check_cancelled, report_progress, run_analyzers
+from frame_preprocessing import prepare_rgb_frame
 
-def calculate_red_flag_percentage(video_path: str) -> float:
-    mp_face_mesh = mp.solutions.face_mesh
-    face_mesh = mp_face_mesh.FaceMesh(static_image_mode=False, max_num_faces=2)
-    mp_drawing = mp.solutions.drawing_utils
-
-    cap = cv2.VideoCapture(video_path)
 
-    total_frames = 0
-    red_flag_frames = 0
+class RedFlagAnalyzer(Analyzer):
+    name = "red_flag"
+    result_key = "red_flag_percentage"
+    inputs = (FRAMES,)
+    needs_rgb = True
 
-    while cap.isOpened():
-        ret, frame = cap.read()
-        if not ret:
-            break
-
-        total_frames += 1
+    def start(self, context):
+        import mediapipe as mp
+        self.face_mesh = mp.solutions.face_mesh.FaceMesh(static_image_mode=False, max_num_faces=2)
+        self.total_frames = 0
+        self.red_flag_frames = 0
 
-        # Convert the BGR frame to RGB
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    def update(self, frame_index, frame, rgb_frame):
+        self.total_frames += 1
 
         # Get face mesh result
-        results = face_mesh.process(rgb_frame)
+        results = self.face_mesh.process(rgb_frame)
 
         # Count how many faces are detected
         face_count = 0
@@ -31,13 +27,139 @@ def calculate_red_flag_percentage(video_path: str) -> float:
 
         # Red flag condition: not exactly 1 face
         if face_count != 1:
-            red_flag_frames += 1
+            self.red_flag_frames += 1
+
+    def finalize(self, context):
+        if self.total_frames == 0:
+            return 0.0
+        return (self.red_flag_frames / self.total_frames) * 100
+
+    def close(self):
+        if getattr(self, "face_mesh", None) is not None:
+            self.face_mesh.close()
+            self.face_mesh = None
+
+
+def calculate_red_flag_percentage(video_path: str) -> float:
+    return run_analyzers([RedFlagAnalyzer()], video_path=video_path)["red_flag_percentage"]
+
+
+SCREEN_SAMPLE_SECONDS = 1.0
+SCREEN_CONFIDENCE = 0.95
 
-    cap.release()
-    face_mesh.close()
+
+def sample_face_counts(cap, step, face_detection, progress_callback=None, cancel_token=None):
+    # Run the cheap detector on every `step`-th frame; grab() skips the rest without
+    # converting them
+    import cv2
+    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    samples = []
+    frame_index = 0
+    while True:
+        check_cancelled(cancel_token)
+        if frame_index % PROGRESS_EVERY == 0:
+            report_progress(progress_callback, "screening", frame_index, frame_count)
+        if frame_index % step == 0:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            results = face_detection.process(prepare_rgb_frame(frame))
+            samples.append((frame_index, len(results.detections) if results.detections else 0))
+        elif not cap.grab():
+            break
+        frame_index += 1
+    return samples, frame_index
+
+
+def escalation_windows(samples, total_frames):
+    # Frame ranges around every sample that isn't exactly one face, or whose count
+    # differs from a neighbouring sample, merged where they overlap
+    windows = []
+    for i, (frame_index, face_count) in enumerate(samples):
+        prev_count = samples[i - 1][1] if i > 0 else face_count
+        next_count = samples[i + 1][1] if i + 1 < len(samples) else face_count
+        if face_count == 1 and prev_count == face_count and next_count == face_count:
+            continue
+        start = samples[i - 1][0] if i > 0 else 0
+        end = samples[i + 1][0] if i + 1 < len(samples) else total_frames
+        if windows and start <= windows[-1][1]:
+            windows[-1][1] = max(windows[-1][1], end)
+        else:
+            windows.append([start, end])
+    return windows
+
+
+def screen_red_flag_percentage(video_path: str, sample_seconds: float = SCREEN_SAMPLE_SECONDS,
+                               confidence: float = SCREEN_CONFIDENCE, progress_callback=None,
+                               cancel_token=None) -> dict:
+    # Fast screening: sparse FaceDetection samples, dense FaceMesh only where the
+    # face count deviates. Frames that were never analyzed densely are assumed clean,
+    # and the upper bound covers red flags the sparse samples could have missed.
+    import cv2
+    import mediapipe as mp
+
+    cap = cv2.VideoCapture(video_path)
+    face_detection = None
+    face_mesh = None
+    try:
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30
+        step = max(int(round(fps * sample_seconds)), 1)
+
+        face_detection = mp.solutions.face_detection.FaceDetection(model_selection=1, min_detection_confidence=0.5)
+        samples, total_frames = sample_face_counts(cap, step, face_detection, progress_callback, cancel_token)
+
+        windows = escalation_windows(samples, total_frames)
+        dense_total = sum(end - start for start, end in windows)
+
+        face_mesh = mp.solutions.face_mesh.FaceMesh(static_image_mode=False, max_num_faces=2)
+        dense_frames = 0
+        red_flag_frames = 0
+        for start, end in windows:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+            for _ in range(start, end):
+                check_cancelled(cancel_token)
+                if dense_frames % PROGRESS_EVERY == 0:
+                    report_progress(progress_callback, "dense", dense_frames, dense_total)
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                dense_frames += 1
+                results = face_mesh.process(prepare_rgb_frame(frame))
+                face_count = len(results.multi_face_landmarks) if results.multi_face_landmarks else 0
+                if face_count != 1:
+                    red_flag_frames += 1
+    finally:
+        cap.release()
+        if face_detection is not None:
+            face_detection.close()
+        if face_mesh is not None:
+            face_mesh.close()
 
     if total_frames == 0:
-        return 0.0
+        return {
+            "red_flag_percentage": 0.0,
+            "upper_bound_percentage": 0.0,
+            "confidence": confidence,
+            "frames_sampled": 0,
+            "frames_dense": 0,
+            "total_frames": 0,
+        }
+
+    # Every sample outside the windows saw exactly one face. With n such samples and
+    # no hits, the one-sided upper bound on the red-flag rate is 1 - (1 - confidence)^(1/n).
+    screened_frames = total_frames - dense_frames
+    clean_samples = sum(1 for frame_index, _ in samples
+                        if not any(start <= frame_index < end for start, end in windows))
+    if screened_frames > 0:
+        miss_rate = 1 - (1 - confidence) ** (1 / clean_samples) if clean_samples else 1.0
+    else:
+        miss_rate = 0.0
 
-    red_flag_percentage = (red_flag_frames / total_frames) * 100
-    return red_flag_percentage
+    return {
+        "red_flag_percentage": (red_flag_frames / total_frames) * 100,
+        "upper_bound_percentage": ((red_flag_frames + miss_rate * screened_frames) / total_frames) * 100,
+        "confidence": confidence,
+        "frames_sampled": len(samples),
+        "frames_dense": dense_frames,
+        "total_frames": total_frames,
+    }
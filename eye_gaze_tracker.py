@@ -1,75 +1,119 @@
-import cv2
-import mediapipe as mp
-
-def calculate_attention_percentage(video_path: str) -> float:
-    mp_face_mesh = mp.solutions.face_mesh
-    face_mesh = mp_face_mesh.FaceMesh(static_image_mode=False, max_num_faces=1, refine_landmarks=True)
-
-    cap = cv2.VideoCapture(video_path)
-
-    total_frames = 0
-    attentive_frames = 0
-    consecutive_lost = 0
-    max_tolerable_loss = 5
-
-    LEFT_IRIS = [474]
-    RIGHT_IRIS = [469]
-    LEFT_EYE_TOP = 159
-    LEFT_EYE_CENTER = 468
-    LEFT_EYE_BOTTOM = 145
-    RIGHT_EYE_TOP = 386
-    RIGHT_EYE_CENTER = 473
-    RIGHT_EYE_BOTTOM = 374
-
-    def vertical_distance(p1, p2):
-        return abs(p1[1] - p2[1])
-
-    while cap.isOpened():
-        success, frame = cap.read()
-        if not success:
-            break
-
-        total_frames += 1
-        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        results = face_mesh.process(frame_rgb)
-
-        attentive = True  # assume attentive until proven otherwise
+import numpy as np
+from analyzers import Analyzer, FRAMES, run_analyzers
+from frame_preprocessing import scale_pixel_threshold
+from face_track import FaceTrack
+
+LEFT_EYE_TOP = 159
+LEFT_EYE_CENTER = 468
+LEFT_EYE_BOTTOM = 145
+RIGHT_EYE_TOP = 386
+RIGHT_EYE_CENTER = 473
+RIGHT_EYE_BOTTOM = 374
+
+# Column order of the landmark buffer: (top, center, bottom) for the left eye, then the right eye
+EYE_LANDMARKS = [LEFT_EYE_TOP, LEFT_EYE_CENTER, LEFT_EYE_BOTTOM,
+                 RIGHT_EYE_TOP, RIGHT_EYE_CENTER, RIGHT_EYE_BOTTOM]
+
+EYE_CLOSED_THRESHOLD_PX = 3  # at the reference height
+MAX_TOLERABLE_LOSS = 5
+
+
+def landmarks_to_array(landmarks, ids, h, out):
+    # Write the pixel y coordinate of each requested landmark into a preallocated row
+    for col, landmark_id in enumerate(ids):
+        out[col] = landmarks[landmark_id].y
+    np.multiply(out, h, out=out)
+    np.trunc(out, out=out)
+    return out
+
+
+def eyes_closed_mask(eye_y, threshold):
+    # eye_y is (n_frames, 6) pixel y coordinates; both eyes must be closed
+    left = eye_y[:, 0:3]
+    right = eye_y[:, 3:6]
+
+    def closed(eye):
+        d1 = np.abs(eye[:, 0] - eye[:, 1])
+        d2 = np.abs(eye[:, 1] - eye[:, 2])
+        d3 = np.abs(eye[:, 0] - eye[:, 2])
+        return (d1 < threshold) & (d2 < threshold) & (d3 < threshold)
+
+    return closed(left) & closed(right)
+
+
+def closed_run_lengths(closed):
+    # Length of the run of consecutive closed frames ending at each frame (0 when open)
+    idx = np.arange(closed.size)
+    last_open = np.maximum.accumulate(np.where(closed, -1, idx))
+    return np.where(closed, idx - last_open, 0)
+
+
+class AttentionAnalyzer(Analyzer):
+    name = "attention"
+    result_key = "attention_percentage"
+    inputs = (FRAMES,)
+    needs_rgb = True
+
+    def __init__(self, max_tolerable_loss: int = MAX_TOLERABLE_LOSS):
+        self.max_tolerable_loss = max_tolerable_loss
+
+    def start(self, context):
+        import mediapipe as mp
+        self.face_mesh = mp.solutions.face_mesh.FaceMesh(static_image_mode=False, max_num_faces=1, refine_landmarks=True)
+        self.face_track = context["face_track"]
+
+        # Preallocate from the container's frame count and grow if it was wrong
+        self.capacity = max(context.get("frame_count", 0), 1)
+        self.eye_y = np.empty((self.capacity, len(EYE_LANDMARKS)), dtype=np.float64)
+        self.has_face = np.zeros(self.capacity, dtype=bool)
+        self.total_frames = 0
+        self.frame_height = None
+
+    def update(self, frame_index, frame, rgb_frame):
+        if self.total_frames == self.capacity:
+            self.capacity *= 2
+            self.eye_y = np.resize(self.eye_y, (self.capacity, len(EYE_LANDMARKS)))
+            self.has_face = np.resize(self.has_face, self.capacity)
+            self.has_face[self.total_frames:] = False
+
+        results = self.face_mesh.process(rgb_frame)
 
         if results.multi_face_landmarks:
+            self.frame_height = rgb_frame.shape[0]
             landmarks = results.multi_face_landmarks[0].landmark
-            h, w, _ = frame.shape
+            landmarks_to_array(landmarks, EYE_LANDMARKS, self.frame_height, self.eye_y[self.total_frames])
+            self.has_face[self.total_frames] = True
+            self.face_track.update(frame_index, landmarks=landmarks)
+        else:
+            self.face_track.mark_no_face(frame_index)
 
-            def get_px(id): return int(landmarks[id].x * w), int(landmarks[id].y * h)
+        self.total_frames += 1
 
-            # Get left and right eye top-center-bottom points
-            lt, lc, lb = get_px(LEFT_EYE_TOP), get_px(LEFT_EYE_CENTER), get_px(LEFT_EYE_BOTTOM)
-            rt, rc, rb = get_px(RIGHT_EYE_TOP), get_px(RIGHT_EYE_CENTER), get_px(RIGHT_EYE_BOTTOM)
+    def finalize(self, context):
+        total_frames = self.total_frames
+        if total_frames == 0:
+            return 0.0
 
-            # Eye closed logic
-            def is_eye_closed(top, center, bottom):
-                d1 = vertical_distance(top, center)
-                d2 = vertical_distance(center, bottom)
-                d3 = vertical_distance(top, bottom)
-                threshold = 3  # adjust based on resolution
-                return d1 < threshold and d2 < threshold and d3 < threshold
+        has_face = self.has_face[:total_frames]
+        face_eye_y = self.eye_y[:total_frames][has_face]
 
-            if is_eye_closed(lt, lc, lb) and is_eye_closed(rt, rc, rb):
-                consecutive_lost += 1
-                if consecutive_lost >= max_tolerable_loss:
-                    attentive = False
-            else:
-                consecutive_lost = 0  # regained attention
+        if face_eye_y.shape[0] == 0:
+            return 0.0
 
-        else:
-            attentive = False
+        # Frames without a face count as inattentive but don't break a run of closed eyes
+        threshold = scale_pixel_threshold(EYE_CLOSED_THRESHOLD_PX, self.frame_height)
+        closed = eyes_closed_mask(face_eye_y, threshold)
+        lost = closed & (closed_run_lengths(closed) >= self.max_tolerable_loss)
 
-        if attentive:
-            attentive_frames += 1
+        attentive_frames = int(np.count_nonzero(~lost))
+        return (attentive_frames / total_frames) * 100
 
-    cap.release()
-    face_mesh.close()
+    def close(self):
+        if getattr(self, "face_mesh", None) is not None:
+            self.face_mesh.close()
+            self.face_mesh = None
 
-    if total_frames == 0:
-        return 0.0
 
-    return (attentive_frames / total_frames) * 100
+def calculate_attention_percentage(video_path: str, face_track: FaceTrack = None) -> float:
+    results = run_analyzers([AttentionAnalyzer()], video_path=video_path, face_track=face_track)
+    return results["attention_percentage"]
@@ -0,0 +1,137 @@
+from frame_preprocessing import resize_for_analysis
+
+REDETECT_INTERVAL = 30  # frames a tracked box is trusted before running the detector again
+CROP_MARGIN = 0.2
+
+# FaceMesh landmarks on the face oval
+FACE_TOP = 10
+FACE_BOTTOM = 152
+FACE_LEFT = 234
+FACE_RIGHT = 454
+
+
+def create_box_tracker():
+    import cv2
+    # KCF ships with opencv-contrib; fall back to MIL from the main package
+    if hasattr(cv2, "TrackerKCF_create"):
+        return cv2.TrackerKCF_create()
+    return cv2.TrackerMIL_create()
+
+
+class FaceTrack:
+    # Face box of the current frame, shared between analyzers, in normalized
+    # (x, y, w, h) coordinates so it works at any frame resolution. Boxes come from
+    # FaceMesh landmarks when an analyzer already has them, otherwise from a cheap box
+    # tracker, and the face detector only runs when neither is available or tracking
+    # fails. KCF/MIL can only follow the face between consecutive frames, so the
+    # tracker is only started once a box is requested for the very next frame; when
+    # boxes are requested sparsely (e.g. every 10th frame for emotion alone) every
+    # request just re-detects.
+
+    def __init__(self, redetect_interval=REDETECT_INTERVAL, min_detection_confidence=0.5):
+        self.redetect_interval = redetect_interval
+        self.min_detection_confidence = min_detection_confidence
+        self.detections = 0
+        self._detector = None
+        self._tracker = None
+        self._frames_since_detect = 0
+        self._last_index = None
+        self._last_box = None
+
+    def _detect(self, frame):
+        import cv2
+        if self._detector is None:
+            import mediapipe as mp
+            self._detector = mp.solutions.face_detection.FaceDetection(
+                model_selection=1, min_detection_confidence=self.min_detection_confidence)
+        self.detections += 1
+        results = self._detector.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+        if not results.detections:
+            return None
+        best = max(results.detections, key=lambda d: d.score[0])
+        rel = best.location_data.relative_bounding_box
+        return clip_box((rel.xmin, rel.ymin, rel.width, rel.height))
+
+    def _start_tracking(self, frame, box):
+        h, w = frame.shape[:2]
+        x, y, bw, bh = box
+        self._tracker = create_box_tracker()
+        self._tracker.init(frame, (int(x * w), int(y * h), max(int(bw * w), 1), max(int(bh * h), 1)))
+
+    def _track(self, frame):
+        ok, (x, y, bw, bh) = self._tracker.update(frame)
+        if not ok:
+            return None
+        h, w = frame.shape[:2]
+        return clip_box((x / w, y / h, bw / w, bh / h))
+
+    def update(self, frame_index, frame=None, landmarks=None):
+        # Pass `landmarks` when FaceMesh already located the face in this frame
+        if landmarks is not None:
+            box = box_from_landmarks(landmarks)
+            self._tracker = None
+            self._frames_since_detect = 0
+        else:
+            frame = resize_for_analysis(frame)
+            box = None
+            consecutive = self._last_index is not None and frame_index == self._last_index + 1
+            if consecutive and self._last_box is not None and self._frames_since_detect < self.redetect_interval:
+                self._frames_since_detect += 1
+                if self._tracker is None:
+                    # The previous frame's box was located; seed the tracker on this frame
+                    # with it, the face barely moves in one frame
+                    box = self._last_box
+                    self._start_tracking(frame, box)
+                else:
+                    box = self._track(frame)
+            if box is None:
+                box = self._detect(frame)
+                self._tracker = None
+                self._frames_since_detect = 0
+
+        self._last_index = frame_index
+        self._last_box = box
+        return box
+
+    def mark_no_face(self, frame_index):
+        self._last_index = frame_index
+        self._last_box = None
+        self._tracker = None
+
+    def box_for(self, frame_index, frame):
+        # Reuse a box another analyzer already produced for this frame
+        if frame_index == self._last_index:
+            return self._last_box
+        return self.update(frame_index, frame)
+
+    def close(self):
+        if self._detector is not None:
+            self._detector.close()
+            self._detector = None
+        self._tracker = None
+
+
+def clip_box(box):
+    x, y, w, h = box
+    x0, y0 = max(x, 0.0), max(y, 0.0)
+    x1, y1 = min(x + w, 1.0), min(y + h, 1.0)
+    if x1 <= x0 or y1 <= y0:
+        return None
+    return (x0, y0, x1 - x0, y1 - y0)
+
+
+def box_from_landmarks(landmarks):
+    # Forehead, chin and cheek points of the face oval bound the face well enough
+    left, right = landmarks[FACE_LEFT].x, landmarks[FACE_RIGHT].x
+    top, bottom = landmarks[FACE_TOP].y, landmarks[FACE_BOTTOM].y
+    return clip_box((min(left, right), top, abs(right - left), bottom - top))
+
+
+def crop_face(frame, box, margin=CROP_MARGIN):
+    h, w = frame.shape[:2]
+    x, y, bw, bh = box
+    x0 = max(int((x - bw * margin) * w), 0)
+    y0 = max(int((y - bh * margin) * h), 0)
+    x1 = min(int((x + bw * (1 + margin)) * w), w)
+    y1 = min(int((y + bh * (1 + margin)) * h), h)
+    return frame[y0:y1, x0:x1]
@@ -0,0 +1,40 @@
+import os
+
+# Longest side (in pixels) frames are shrunk to before inference. MediaPipe resizes
+# to its own model input size anyway, so larger frames only cost memory bandwidth.
+ANALYSIS_MAX_SIDE = int(os.getenv("ANALYSIS_MAX_SIDE", "640"))
+
+# Frame height that absolute pixel thresholds in the trackers were tuned for
+REFERENCE_HEIGHT = 480
+
+
+def analysis_size(width, height, max_side=ANALYSIS_MAX_SIDE):
+    # (width, height) a frame of the given size is shrunk to
+    longest = max(width, height)
+    if max_side is None or max_side <= 0 or longest <= max_side:
+        return width, height
+    scale = max_side / longest
+    return round(width * scale), round(height * scale)
+
+
+def resize_for_analysis(frame, max_side=ANALYSIS_MAX_SIDE, dst=None):
+    h, w = frame.shape[:2]
+    size = analysis_size(w, h, max_side)
+    if size == (w, h):
+        if dst is not None:
+            dst[...] = frame
+            return dst
+        return frame
+    import cv2
+    return cv2.resize(frame, size, dst=dst, interpolation=cv2.INTER_AREA)
+
+
+def prepare_rgb_frame(frame, max_side=ANALYSIS_MAX_SIDE):
+    # Resize first so the colour conversion runs on the small frame
+    import cv2
+    return cv2.cvtColor(resize_for_analysis(frame, max_side), cv2.COLOR_BGR2RGB)
+
+
+def scale_pixel_threshold(threshold_px, frame_height, reference_height=REFERENCE_HEIGHT):
+    # Convert a threshold tuned at reference_height into pixels at frame_height
+    return threshold_px * frame_height / reference_height
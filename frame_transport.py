@@ -0,0 +1,251 @@
+import multiprocessing as mp
+import queue
+from multiprocessing import shared_memory
+
+import numpy as np
+from analyzers import Analyzer, check_cancelled, is_due
+from face_track import FaceTrack
+from frame_preprocessing import ANALYSIS_MAX_SIDE, analysis_size, resize_for_analysis
+from resource_manager import CONCURRENT_STAGES, configure_process
+
+DEFAULT_SLOTS = 8
+ACQUIRE_POLL_SECONDS = 1.0
+
+
+class SharedFrameRing:
+    # Fixed pool of frame-sized shared-memory slots. The decoder blocks when every
+    # slot is still held by a consumer, so RAM stays at n_slots frames no matter
+    # how far ahead decoding gets. Consumers receive only (slot, frame_index)
+    # through their queue and read the pixels in place, no pickling or copying.
+
+    def __init__(self, frame_shape, n_slots=DEFAULT_SLOTS, n_consumers=1, ctx=None):
+        ctx = ctx or mp.get_context("spawn")
+        self.frame_shape = tuple(frame_shape)
+        self.n_slots = n_slots
+        self.n_consumers = n_consumers
+        self.frame_nbytes = int(np.prod(self.frame_shape))
+
+        self._shm = shared_memory.SharedMemory(create=True, size=self.frame_nbytes * n_slots)
+        self.shm_name = self._shm.name
+        self._owner = True
+
+        self.free_slots = ctx.Queue()
+        for slot in range(n_slots):
+            self.free_slots.put(slot)
+        self.consumer_queues = [ctx.Queue() for _ in range(n_consumers)]
+        self.refcounts = ctx.Array("i", n_slots)
+        self._finished = False
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_shm"] = None
+        state["_owner"] = False
+        return state
+
+    def _buffer(self):
+        if self._shm is None:
+            self._shm = shared_memory.SharedMemory(name=self.shm_name)
+        return self._shm.buf
+
+    def slot(self, index):
+        offset = index * self.frame_nbytes
+        return np.ndarray(self.frame_shape, dtype=np.uint8, buffer=self._buffer(), offset=offset)
+
+    def acquire(self, timeout=None):
+        # Blocks until a consumer hands a slot back (backpressure)
+        return self.free_slots.get(timeout=timeout)
+
+    def publish(self, slot, frame_index):
+        with self.refcounts.get_lock():
+            self.refcounts[slot] = self.n_consumers
+        for q in self.consumer_queues:
+            q.put((slot, frame_index))
+
+    def release(self, slot):
+        with self.refcounts.get_lock():
+            self.refcounts[slot] -= 1
+            done = self.refcounts[slot] == 0
+        if done:
+            self.free_slots.put(slot)
+
+    def finish(self):
+        for q in self.consumer_queues:
+            q.put(None)
+
+    def frames(self, consumer_id):
+        # Yields (frame_index, frame) views into shared memory. A view is only valid
+        # until the next iteration; copy it if it needs to outlive the loop body.
+        q = self.consumer_queues[consumer_id]
+        while True:
+            item = q.get()
+            if item is None:
+                self._finished = True
+                return
+            slot, frame_index = item
+            try:
+                yield frame_index, self.slot(slot)
+            finally:
+                self.release(slot)
+
+    def drain(self, consumer_id):
+        # Give back every remaining frame so the decoder never waits on a finished consumer
+        if self._finished:
+            return
+        for _ in self.frames(consumer_id):
+            pass
+
+    def close(self):
+        if self._shm is None:
+            return
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+        self._shm = None
+
+
+def decode_into_ring(cap, ring, max_side=ANALYSIS_MAX_SIDE, is_alive=None, cancel_token=None):
+    import cv2
+    frame_index = 0
+    scratch = None
+    direct = ring.frame_shape[:2] == (int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)), int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)))
+
+    while cap.isOpened():
+        slot = None
+        while slot is None:
+            check_cancelled(cancel_token)
+            try:
+                slot = ring.acquire(timeout=ACQUIRE_POLL_SECONDS)
+            except queue.Empty:
+                if is_alive is not None and not is_alive():
+                    raise RuntimeError("An analyzer process exited before consuming all frames.")
+
+        target = ring.slot(slot)
+        if direct:
+            # Decode straight into shared memory
+            success, _ = cap.read(target)
+        else:
+            success, scratch = cap.read(scratch)
+            if success:
+                resize_for_analysis(scratch, max_side, dst=target)
+
+        if not success:
+            ring.free_slots.put(slot)
+            break
+
+        ring.publish(slot, frame_index)
+        frame_index += 1
+
+    ring.finish()
+    return frame_index
+
+
+class AnalyzerConsumer:
+    # Runs an Analyzer as a ring consumer: the same start/update/finalize/close
+    # sequence as run_analyzers(), on the frames its frame_step selects. Each worker
+    # process has its own FaceTrack, so face boxes are not shared between workers.
+    def __init__(self, analyzer, context):
+        self.analyzer = analyzer
+        self.context = context
+
+    def __call__(self, frames):
+        import cv2
+        context = dict(self.context, face_track=FaceTrack())
+        analyzer = self.analyzer
+        try:
+            analyzer.start(context)
+            frames_decoded = 0
+            for frame_index, frame in frames:
+                frames_decoded = frame_index + 1
+                if not is_due(analyzer, frame_index):
+                    continue
+                rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB) if analyzer.needs_rgb else None
+                analyzer.update(frame_index, frame, rgb_frame)
+            context["frames_decoded"] = frames_decoded
+            return analyzer.finalize(context)
+        finally:
+            analyzer.close()
+            context["face_track"].close()
+
+
+def _worker_main(ring, consumer_id, analyze, results):
+    # Every worker process shares the machine with its siblings
+    configure_process(CONCURRENT_STAGES * ring.n_consumers, override=True)
+    try:
+        result = analyze(ring.frames(consumer_id))
+        ring.drain(consumer_id)
+        results.put((consumer_id, result, None))
+    except Exception as e:
+        ring.drain(consumer_id)
+        results.put((consumer_id, None, repr(e)))
+    finally:
+        ring.close()
+
+
+def _collect_results(workers, results, cancel_token=None):
+    # Never block on a worker that is gone: poll the queue and check exit codes in between
+    collected = {}
+    exited = set()
+    while len(collected) < len(workers):
+        check_cancelled(cancel_token)
+        try:
+            consumer_id, result, error = results.get(timeout=ACQUIRE_POLL_SECONDS)
+        except queue.Empty:
+            for i, worker in enumerate(workers):
+                if i in collected or worker.exitcode is None:
+                    continue
+                # A clean exit puts its result first; give it one more poll to arrive
+                if worker.exitcode != 0 or i in exited:
+                    raise RuntimeError(
+                        f"Analyzer {i} exited with code {worker.exitcode} without returning a result.")
+                exited.add(i)
+            continue
+        if error is not None:
+            raise RuntimeError(f"Analyzer {consumer_id} failed: {error}")
+        collected[consumer_id] = result
+    return collected
+
+
+def run_frame_workers(video_path, analyzers, n_slots=DEFAULT_SLOTS, max_side=ANALYSIS_MAX_SIDE, cancel_token=None):
+    # Decode the video once and feed every analyzer from the same shared ring, each in
+    # its own process. Analyzers are either Analyzer instances (with FRAMES input) or
+    # picklable callables taking an iterator of (frame_index, bgr_frame); results are
+    # returned in the same order and must be picklable.
+    import cv2
+    ctx = mp.get_context("spawn")
+    cap = cv2.VideoCapture(video_path)
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    out_w, out_h = analysis_size(width, height, max_side)
+    context = {
+        "video_path": video_path,
+        "fps": cap.get(cv2.CAP_PROP_FPS) or 30,
+        "frame_count": int(cap.get(cv2.CAP_PROP_FRAME_COUNT)),
+    }
+    analyzers = [AnalyzerConsumer(a, context) if isinstance(a, Analyzer) else a for a in analyzers]
+
+    ring = SharedFrameRing((out_h, out_w, 3), n_slots=n_slots, n_consumers=len(analyzers), ctx=ctx)
+    results = ctx.Queue()
+    workers = [
+        ctx.Process(target=_worker_main, args=(ring, i, analyze, results), daemon=True)
+        for i, analyze in enumerate(analyzers)
+    ]
+
+    try:
+        for worker in workers:
+            worker.start()
+        decode_into_ring(cap, ring, max_side, is_alive=lambda: all(w.is_alive() for w in workers),
+                         cancel_token=cancel_token)
+
+        collected = _collect_results(workers, results, cancel_token)
+        return [collected[i] for i in range(len(analyzers))]
+    finally:
+        cap.release()
+        for worker in workers:
+            if worker.is_alive():
+                worker.terminate()
+            worker.join()
+        for q in (results, ring.free_slots, *ring.consumer_queues):
+            # A dead consumer never drains what was queued for it; don't wait on it at exit
+            q.close()
+            q.cancel_join_thread()
+        ring.close()
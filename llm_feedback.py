@@ -57,11 +57,13 @@ Address the speaker directly as "you".
 **Category: Quality of Speech**
 
 * **Speech Rate**
+  * Use speech_metrics.speech_rate_wpm from metrics:
   * Low: < 90 or > 170 wpm
   * Medium: 90–170 wpm
   * High: Optimal 110–150 wpm
 
 * **Fluency & Pauses**
+  * Use speech_metrics.long_pause_count and speech_metrics.stumble_count from metrics:
   * Low: >6 long pauses (>1.5s) and >5 stumbles
   * Medium: 2–5 long pauses or hesitations
   * High: <2 long pauses; smooth delivery
@@ -95,16 +97,19 @@ Address the speaker directly as "you".
 **Category: Filler Words & Pauses**
 
 * **Filler Word Use**
-  * Low: >10 fillers (um, like, etc.)
+  * Use speech_metrics.filler_word_count from metrics (not possible_filler_count):
+  * Low: >10 fillers (um, uh, etc.)
   * Medium: 4–10 filler words
   * High: 0–3 filler words
 
 * **Pausing Patterns**
+  * Use speech_metrics.long_pause_count from metrics:
   * Low: >5 long/awkward pauses
   * Medium: 2–5 noticeable pauses
   * High: Smooth flow, <2 pauses
 
 * **Word Repetition**
+  * Use speech_metrics.word_repetition_percentage from metrics (repeats within any 50 key words):
   * Low: >30% key word repetition
   * Medium: <20%
   * High: Diverse word use
@@ -0,0 +1,58 @@
+import copy
+import json
+import os
+
+from analyzers import run_analyzers
+from emotion_tracker import EmotionAnalyzer
+from exactly_one_face import RedFlagAnalyzer
+from eye_gaze_tracker import AttentionAnalyzer
+from gesture_posture_tracker import GesturePostureTracker
+from pitch_variation_tracker import PitchVariationAnalyzer, VocalMetricsAnalyzer
+from speech_metrics import SpeechMetricsAnalyzer
+
+# Run order matters: attention fills the shared face track that emotion reads
+ANALYZER_REGISTRY = {
+    RedFlagAnalyzer.name: RedFlagAnalyzer,
+    AttentionAnalyzer.name: AttentionAnalyzer,
+    EmotionAnalyzer.name: EmotionAnalyzer,
+    GesturePostureTracker.name: GesturePostureTracker,
+    PitchVariationAnalyzer.name: PitchVariationAnalyzer,
+    VocalMetricsAnalyzer.name: VocalMetricsAnalyzer,
+    SpeechMetricsAnalyzer.name: SpeechMetricsAnalyzer,
+}
+
+DEFAULT_PIPELINE_CONFIG = {name: {"enabled": True} for name in ANALYZER_REGISTRY}
+
+PIPELINE_CONFIG_PATH = os.getenv(
+    "PIPELINE_CONFIG", os.path.join(os.path.dirname(os.path.abspath(__file__)), "pipeline_config.json"))
+
+
+def load_pipeline_config(path=PIPELINE_CONFIG_PATH):
+    # Analyzers missing from the file keep their defaults; unknown names are rejected
+    config = copy.deepcopy(DEFAULT_PIPELINE_CONFIG)
+    if path and os.path.exists(path):
+        with open(path, "r") as f:
+            overrides = json.load(f)
+        for name, options in overrides.get("analyzers", {}).items():
+            if name not in ANALYZER_REGISTRY:
+                raise ValueError(f"Unknown analyzer '{name}' in {path}. Choose from {list(ANALYZER_REGISTRY)}.")
+            config[name].update(options)
+    return config
+
+
+def build_analyzers(config):
+    analyzers = []
+    for name, analyzer_cls in ANALYZER_REGISTRY.items():
+        options = dict(config.get(name, {}))
+        if not options.pop("enabled", True):
+            continue
+        analyzers.append(analyzer_cls(**options))
+    return analyzers
+
+
+def run_pipeline(config, video_path, audio_path=None, transcription=None, progress_callback=None,
+                 cancel_token=None, timings=None, threads=None):
+    # Every enabled frame analyzer shares one decode of the video; disabled stages cost nothing
+    return run_analyzers(build_analyzers(config), video_path=video_path, audio_path=audio_path,
+                         transcription=transcription, progress_callback=progress_callback,
+                         cancel_token=cancel_token, timings=timings, threads=threads)
@@ -1,7 +1,5 @@
-import librosa
 import numpy as np
-import torch
-import crepe
+from analyzers import Analyzer, AUDIO, check_cancelled, report_progress
 
 def classify_pitch_range(pitch_range_hz):
     if pitch_range_hz < 20:
@@ -11,15 +9,51 @@ def classify_pitch_range(pitch_range_hz):
     else:
         return "Strong, expressive tone (pitch range > 60 Hz)"
 
-def calculate_pitch_variation_percentages(audio_path):
+CONFIDENCE_THRESHOLD = 0.5
+
+CREPE_WINDOW = 1024  # samples per CREPE frame
+PITCH_CHUNK_FRAMES = 300  # CREPE frames per call (30 s at the 100ms step)
+
+
+def extract_pitch_track(audio_path, step_size=100, progress_callback=None, cancel_token=None):
+    # Single CREPE pass; every vocal metric is computed from these time-aligned arrays
+    import librosa
+    from crepe.core import get_activation, to_viterbi_cents  # loads TensorFlow/Keras
+
     # Load audio
     y, sr = librosa.load(audio_path, sr=16000)  # CREPE expects 16kHz
 
-    # Run CREPE (use 100ms step size = 10Hz frame rate)
-    _, frequency, confidence, _ = crepe.predict(y, sr, viterbi=True, step_size=100)
+    # Same frames as crepe.predict(center=True) (use 100ms step size = 10Hz frame rate),
+    # computed a chunk at a time so long recordings report progress and can be stopped
+    hop = int(sr * step_size / 1000)
+    padded = np.pad(y, CREPE_WINDOW // 2)
+    n_frames = 1 + len(y) // hop
+    activations = []
+    for start in range(0, n_frames, PITCH_CHUNK_FRAMES):
+        check_cancelled(cancel_token)
+        report_progress(progress_callback, "pitch", start, n_frames)
+        count = min(PITCH_CHUNK_FRAMES, n_frames - start)
+        segment = padded[start * hop:(start + count - 1) * hop + CREPE_WINDOW]
+        activations.append(get_activation(segment, sr, center=False, step_size=step_size, verbose=0))
+    report_progress(progress_callback, "pitch", n_frames, n_frames)
+    activation = np.concatenate(activations)
+
+    # Viterbi smoothing over the whole recording, as crepe.predict(viterbi=True) does
+    confidence = activation.max(axis=1)
+    frequency = 10 * 2 ** (to_viterbi_cents(activation) / 1200)
+    frequency[np.isnan(frequency)] = 0
+    time = np.arange(confidence.shape[0]) * step_size / 1000.0
+    return {"time": time, "f0": frequency, "confidence": confidence}
+
+
+def calculate_pitch_variation_percentages(audio_path, pitch_track=None):
+    if pitch_track is None:
+        pitch_track = extract_pitch_track(audio_path)
+    frequency = pitch_track["f0"]
+    confidence = pitch_track["confidence"]
 
     # Filter out low confidence predictions
-    threshold = 0.5
+    threshold = CONFIDENCE_THRESHOLD
     valid_freq = frequency[confidence > threshold]
 
     if len(valid_freq) < 2:
@@ -51,3 +85,68 @@ def calculate_pitch_variation_percentages(audio_path):
     # Convert to percentages
     percentages = {label: (count / total_windows) * 100 for label, count in counts.items()}
     return percentages
+
+
+def calculate_vocal_metrics(pitch_track, threshold=CONFIDENCE_THRESHOLD):
+    time = pitch_track["time"]
+    frequency = pitch_track["f0"]
+    confidence = pitch_track["confidence"]
+
+    voiced = confidence > threshold
+    voiced_ratio = float(np.mean(voiced)) if voiced.size else 0.0
+    f0 = frequency[voiced]
+    t = time[voiced]
+
+    if f0.size < 2:
+        return {
+            "median_pitch_hz": 0.0,
+            "pitch_range_hz": 0.0,
+            "pitch_std_semitones": 0.0,
+            "pitch_trend_semitones_per_min": 0.0,
+            "voiced_ratio": round(voiced_ratio, 3),
+        }
+
+    # Semitones relative to the speaker's own median, so voices of any register compare
+    median_f0 = float(np.median(f0))
+    semitones = 12 * np.log2(f0 / median_f0)
+
+    # 5th-95th percentile range ignores the odd octave error at the edges
+    low, high = np.percentile(f0, [5, 95])
+
+    # Slope of a straight-line fit: negative means the voice drifts down over the talk
+    trend = np.polyfit(t / 60.0, semitones, 1)[0] if np.ptp(t) > 0 else 0.0
+
+    return {
+        "median_pitch_hz": round(median_f0, 1),
+        "pitch_range_hz": round(float(high - low), 1),
+        "pitch_std_semitones": round(float(np.std(semitones)), 2),
+        "pitch_trend_semitones_per_min": round(float(trend), 3),
+        "voiced_ratio": round(voiced_ratio, 3),
+    }
+
+
+def get_pitch_track(context):
+    # Shared between the pitch analyzers so CREPE runs once per video
+    if "pitch_track" not in context:
+        context["pitch_track"] = extract_pitch_track(
+            context["audio_path"], progress_callback=context.get("progress_callback"),
+            cancel_token=context.get("cancel_token"))
+    return context["pitch_track"]
+
+
+class PitchVariationAnalyzer(Analyzer):
+    name = "pitch_variation"
+    result_key = "pitch_variation_distribution"
+    inputs = (AUDIO,)
+
+    def finalize(self, context):
+        return calculate_pitch_variation_percentages(context["audio_path"], get_pitch_track(context))
+
+
+class VocalMetricsAnalyzer(Analyzer):
+    name = "vocal_metrics"
+    result_key = "vocal_metrics"
+    inputs = (AUDIO,)
+
+    def finalize(self, context):
+        return calculate_vocal_metrics(get_pitch_track(context))
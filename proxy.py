@@ -0,0 +1,151 @@
+import hashlib
+import os
+import subprocess
+import tempfile
+import time
+
+from analyzers import AnalysisCancelled, report_progress
+from eye_gaze_tracker import MAX_TOLERABLE_LOSS
+
+# Low-resolution, low-fps, short-GOP copy of the upload that every frame analyzer
+# reads instead of the original. Decoding a 4K long-GOP phone video is the expensive
+# part no matter how few frames get analyzed; the proxy is decoded once by ffmpeg.
+PROXY_ENABLED = os.getenv("PROXY_ENABLED", "0") == "1"
+PROXY_HEIGHT = int(os.getenv("PROXY_HEIGHT", "480"))
+PROXY_FPS = int(os.getenv("PROXY_FPS", "10"))
+PROXY_GOP = int(os.getenv("PROXY_GOP", "10"))  # frames between keyframes, 1 = all-intra
+PROXY_CACHE_DIR = os.getenv("PROXY_CACHE_DIR") or None
+
+POLL_SECONDS = 0.2
+
+
+def ffmpeg_executable():
+    # moviepy already depends on imageio-ffmpeg, which ships a static ffmpeg build
+    try:
+        import imageio_ffmpeg
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except ImportError:
+        return "ffmpeg"
+
+
+def file_digest(path, chunk_size=1 << 20):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def proxy_path_for(video_path, height=PROXY_HEIGHT, fps=PROXY_FPS, gop=PROXY_GOP, cache_dir=PROXY_CACHE_DIR):
+    suffix = f"_proxy_{height}p{fps:g}g{gop}.mp4"
+    if cache_dir:
+        # Keyed by content so the same upload reuses its proxy across sessions
+        return os.path.join(cache_dir, file_digest(video_path) + suffix)
+    return os.path.splitext(video_path)[0] + suffix
+
+
+def proxy_command(video_path, output_path, height=PROXY_HEIGHT, fps=PROXY_FPS, gop=PROXY_GOP, progress_path=None):
+    progress = ["-progress", progress_path, "-nostats"] if progress_path else []
+    return [
+        ffmpeg_executable(), "-y", "-loglevel", "error", *progress,
+        "-i", video_path,
+        "-an",
+        # Never upscale; -2 keeps the width even for yuv420p
+        "-vf", f"scale=-2:'min({height},ih)',fps={fps}",
+        "-c:v", "libx264", "-preset", "veryfast", "-crf", "23", "-pix_fmt", "yuv420p",
+        # Fixed short GOP so any frame is at most `gop` frames from a keyframe
+        "-g", str(gop), "-keyint_min", str(gop), "-sc_threshold", "0",
+        "-movflags", "+faststart",
+        output_path,
+    ]
+
+
+def probe_video(video_path):
+    # (fps, duration in seconds); either is 0 when the container doesn't say
+    import cv2
+    cap = cv2.VideoCapture(video_path)
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    frame_count = cap.get(cv2.CAP_PROP_FRAME_COUNT)
+    cap.release()
+    return fps, frame_count / fps if fps else 0.0
+
+
+def transcoded_seconds(progress_path):
+    # ffmpeg -progress appends key=value blocks; the last out_time_us is how far it got
+    try:
+        with open(progress_path) as f:
+            values = [line.split("=", 1)[1] for line in f if line.startswith("out_time_us=")]
+        return int(values[-1]) / 1e6 if values else 0.0
+    except (OSError, ValueError):
+        return 0.0
+
+
+def adapt_pipeline_config(config, source_fps, proxy_fps=PROXY_FPS):
+    # Frame-count options were tuned on the original frame rate; rescale them so they
+    # cover the same stretch of time on the proxy
+    ratio = proxy_fps / source_fps if source_fps else 1.0
+    if ratio >= 1.0:
+        return config
+    emotion = config["emotion"]
+    emotion["frame_step"] = max(1, round(emotion.get("frame_step", 10) * ratio))
+    attention = config["attention"]
+    attention["max_tolerable_loss"] = max(1, round(attention.get("max_tolerable_loss", MAX_TOLERABLE_LOSS) * ratio))
+    return config
+
+
+def make_proxy(video_path, height=PROXY_HEIGHT, fps=PROXY_FPS, gop=PROXY_GOP, cache_dir=PROXY_CACHE_DIR,
+               progress_callback=None, cancel_token=None):
+    source_fps, duration = probe_video(video_path)
+    if source_fps:
+        # Never raise the frame rate; duplicated frames would only be analyzed twice
+        fps = min(fps, source_fps)
+    output_path = proxy_path_for(video_path, height, fps, gop, cache_dir)
+    if os.path.exists(output_path):
+        print(f"[DEBUG] Reusing proxy: {output_path}")
+        return output_path
+
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+
+    # Write to a unique temp name in the same directory: an interrupted transcode never
+    # looks like a cached proxy, and sessions transcoding the same upload into a shared
+    # cache never write to the same file
+    output_dir = os.path.dirname(output_path) or "."
+    fd, partial_path = tempfile.mkstemp(dir=output_dir, suffix=".partial.mp4")
+    os.close(fd)
+    fd, progress_path = tempfile.mkstemp(dir=output_dir, suffix=".progress")
+    os.close(fd)
+    report_progress(progress_callback, "proxy", 0, int(duration))
+    # stderr goes to a file: nobody reads a pipe while ffmpeg runs, and a full one would stall it
+    error_log = tempfile.TemporaryFile()
+    process = subprocess.Popen(proxy_command(video_path, partial_path, height, fps, gop, progress_path),
+                               stdout=subprocess.DEVNULL, stderr=error_log)
+    try:
+        while process.poll() is None:
+            if cancel_token is not None and cancel_token.cancelled:
+                process.kill()
+                raise AnalysisCancelled("Analysis was cancelled.")
+            # Also gives the UI a chance to stop the run while ffmpeg works
+            done = min(int(transcoded_seconds(progress_path)), int(duration))
+            report_progress(progress_callback, "proxy", done, int(duration))
+            time.sleep(POLL_SECONDS)
+
+        if process.returncode != 0:
+            error_log.seek(0)
+            error = error_log.read().decode(errors="replace").strip()
+            raise RuntimeError(f"Proxy transcode failed: {error}")
+
+        # Another session may have finished the same proxy meanwhile; keep the first one
+        if not os.path.exists(output_path):
+            os.replace(partial_path, output_path)
+    finally:
+        if process.poll() is None:
+            process.kill()
+        process.wait()
+        error_log.close()
+        for path in (partial_path, progress_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    report_progress(progress_callback, "proxy", int(duration), int(duration))
+    return output_path
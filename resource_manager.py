@@ -0,0 +1,113 @@
+import math
+import os
+import sys
+
+# Number of analysis jobs (app sessions or worker processes) expected to run at the same
+# time on this machine; each gets an equal share of the cores. Stages inside one job run
+# one after another, so they all use the job's whole share; only work a stage splits
+# across threads or processes (transcription chunks, frame workers) divides it further.
+CONCURRENT_STAGES = int(os.getenv("CONCURRENT_STAGES", "1"))
+
+THREAD_ENV_VARS = [
+    "OMP_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "TF_NUM_INTRAOP_THREADS",
+    "OPENCV_FOR_THREADS_NUM",
+]
+
+
+def cgroup_cpu_limit():
+    # Containers often get a CPU quota smaller than the visible core count
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            return max(1, math.ceil(int(quota) / int(period)))
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def available_cores():
+    try:
+        cores = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cores = os.cpu_count() or 1
+    limit = cgroup_cpu_limit()
+    return min(cores, limit) if limit else cores
+
+
+def threads_per_stage(concurrent_stages=CONCURRENT_STAGES, cores=None):
+    cores = cores or available_cores()
+    return max(1, cores // max(concurrent_stages, 1))
+
+
+def configure_opencv(threads):
+    # Before cv2 is imported OPENCV_FOR_THREADS_NUM applies, so don't import it just for this
+    if "cv2" not in sys.modules:
+        return
+    import cv2
+    cv2.setNumThreads(threads)
+
+
+def configure_torch(threads):
+    if "torch" not in sys.modules:
+        return
+    import torch
+    torch.set_num_threads(threads)
+    try:
+        # Only allowed before torch starts its inter-op pool
+        torch.set_num_interop_threads(max(1, min(threads, 2)))
+    except RuntimeError:
+        pass
+
+
+def configure_tensorflow(threads):
+    # TensorFlow reads its pool sizes once, when the runtime starts. Before that the
+    # environment variables set by configure_process() apply; only touch the config
+    # API if TF is already imported, and ignore it if the runtime is already up.
+    if "tensorflow" not in sys.modules:
+        return
+    import tensorflow as tf
+    try:
+        tf.config.threading.set_intra_op_parallelism_threads(threads)
+        tf.config.threading.set_inter_op_parallelism_threads(max(1, min(threads, 2)))
+    except RuntimeError:
+        pass
+
+
+def configure_blas(threads):
+    try:
+        from threadpoolctl import threadpool_limits
+    except ImportError:
+        return
+    threadpool_limits(threads)
+
+
+def configure_process(concurrent_stages=CONCURRENT_STAGES, override=False):
+    # Call before the heavy frameworks are imported. MediaPipe has no public thread
+    # setting; it sizes its own pool, so the other frameworks leave room for it.
+    # Worker processes pass override=True: they inherit the parent's variables, which
+    # were sized for the whole job rather than their share of it.
+    threads = threads_per_stage(concurrent_stages)
+    values = {name: str(threads) for name in THREAD_ENV_VARS}
+    values["TF_NUM_INTEROP_THREADS"] = str(max(1, min(threads, 2)))
+    for name, value in values.items():
+        if override:
+            os.environ[name] = value
+        else:
+            os.environ.setdefault(name, value)
+    configure_frameworks(threads)
+    return threads
+
+
+def configure_frameworks(threads=None):
+    # Resize the pools of whichever frameworks are already loaded; the rest pick the
+    # size up from the environment when they are imported
+    threads = threads or threads_per_stage()
+    configure_opencv(threads)
+    configure_torch(threads)
+    configure_tensorflow(threads)
+    configure_blas(threads)
+    return threads
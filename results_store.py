@@ -0,0 +1,190 @@
+import json
+import os
+import sqlite3
+import time
+
+RESULTS_DB_PATH = os.getenv("RESULTS_DB_PATH", "results.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS videos (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    filename TEXT,
+    cohort TEXT,
+    created_at REAL NOT NULL,
+    results_json TEXT NOT NULL,
+    feedback_json TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_videos_created_at ON videos(created_at);
+CREATE INDEX IF NOT EXISTS idx_videos_cohort_created_at ON videos(cohort, created_at);
+
+-- One row per numeric metric, flattened with dotted names (e.g. emotion_distribution.happy)
+CREATE TABLE IF NOT EXISTS metrics (
+    video_id INTEGER NOT NULL REFERENCES videos(id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    value REAL NOT NULL,
+    PRIMARY KEY (video_id, name)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_metrics_name_value ON metrics(name, value);
+
+CREATE TABLE IF NOT EXISTS stage_timings (
+    video_id INTEGER NOT NULL REFERENCES videos(id) ON DELETE CASCADE,
+    stage TEXT NOT NULL,
+    seconds REAL NOT NULL,
+    PRIMARY KEY (video_id, stage)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_stage_timings_stage ON stage_timings(stage, seconds);
+
+CREATE TABLE IF NOT EXISTS timeline (
+    video_id INTEGER NOT NULL REFERENCES videos(id) ON DELETE CASCADE,
+    start REAL NOT NULL,
+    end REAL NOT NULL,
+    kind TEXT NOT NULL,
+    text TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_timeline_video_start ON timeline(video_id, start);
+
+CREATE TABLE IF NOT EXISTS rubric (
+    video_id INTEGER NOT NULL REFERENCES videos(id) ON DELETE CASCADE,
+    category TEXT NOT NULL,
+    criterion TEXT NOT NULL,
+    level TEXT NOT NULL,
+    PRIMARY KEY (video_id, category, criterion)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_rubric_criterion_level ON rubric(criterion, level);
+"""
+
+
+def connect(path=RESULTS_DB_PATH):
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA foreign_keys = ON")
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def flatten_metrics(result_data, prefix=""):
+    # Numeric leaves of the results dict; lists (the transcript) are stored as timeline rows
+    metrics = {}
+    for key, value in result_data.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            metrics.update(flatten_metrics(value, f"{name}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            metrics[name] = float(value)
+    return metrics
+
+
+def rubric_rows(llm_feedback):
+    report = (llm_feedback or {}).get("Rubric Scoring Report")
+    if not isinstance(report, dict):
+        return []
+    rows = []
+    for category, criteria in report.items():
+        if not isinstance(criteria, dict):
+            continue
+        for criterion, level in criteria.items():
+            rows.append((category, criterion, str(level)))
+    return rows
+
+
+def save_results(result_data, stage_timings=None, llm_feedback=None, filename=None, cohort=None,
+                 created_at=None, path=RESULTS_DB_PATH):
+    created_at = time.time() if created_at is None else created_at
+    conn = connect(path)
+    try:
+        with conn:
+            cursor = conn.execute(
+                "INSERT INTO videos (filename, cohort, created_at, results_json, feedback_json) VALUES (?, ?, ?, ?, ?)",
+                (filename, cohort, created_at, json.dumps(result_data, ensure_ascii=False),
+                 json.dumps(llm_feedback, ensure_ascii=False) if llm_feedback is not None else None),
+            )
+            video_id = cursor.lastrowid
+            conn.executemany(
+                "INSERT INTO metrics (video_id, name, value) VALUES (?, ?, ?)",
+                [(video_id, name, value) for name, value in flatten_metrics(result_data).items()],
+            )
+            conn.executemany(
+                "INSERT INTO stage_timings (video_id, stage, seconds) VALUES (?, ?, ?)",
+                [(video_id, stage, seconds) for stage, seconds in (stage_timings or {}).items()],
+            )
+            conn.executemany(
+                "INSERT INTO timeline (video_id, start, end, kind, text) VALUES (?, ?, ?, 'transcript', ?)",
+                [(video_id, seg["start"], seg["end"], seg["text"]) for seg in result_data.get("transcript", [])],
+            )
+            conn.executemany(
+                "INSERT INTO rubric (video_id, category, criterion, level) VALUES (?, ?, ?, ?)",
+                [(video_id, *row) for row in rubric_rows(llm_feedback)],
+            )
+        return video_id
+    finally:
+        conn.close()
+
+
+def query_videos(metric, min_value=None, max_value=None, since=None, until=None, cohort=None,
+                 path=RESULTS_DB_PATH):
+    # e.g. query_videos("red_flag_percentage", min_value=10, since=time.time() - 7 * 86400)
+    sql = """
+        SELECT v.id, v.filename, v.cohort, v.created_at, m.value
+        FROM metrics m JOIN videos v ON v.id = m.video_id
+        WHERE m.name = ?
+    """
+    params = [metric]
+    if min_value is not None:
+        sql += " AND m.value > ?"
+        params.append(min_value)
+    if max_value is not None:
+        sql += " AND m.value < ?"
+        params.append(max_value)
+    if since is not None:
+        sql += " AND v.created_at >= ?"
+        params.append(since)
+    if until is not None:
+        sql += " AND v.created_at < ?"
+        params.append(until)
+    if cohort is not None:
+        sql += " AND v.cohort = ?"
+        params.append(cohort)
+    sql += " ORDER BY v.created_at DESC"
+
+    conn = connect(path)
+    try:
+        return [dict(row) for row in conn.execute(sql, params)]
+    finally:
+        conn.close()
+
+
+def cohort_averages(cohort=None, since=None, until=None, path=RESULTS_DB_PATH):
+    # {metric name: (average, number of videos)} over the selected submissions
+    sql = """
+        SELECT m.name, AVG(m.value) AS average, COUNT(*) AS videos
+        FROM videos v JOIN metrics m ON m.video_id = v.id
+        WHERE 1 = 1
+    """
+    params = []
+    if cohort is not None:
+        sql += " AND v.cohort = ?"
+        params.append(cohort)
+    if since is not None:
+        sql += " AND v.created_at >= ?"
+        params.append(since)
+    if until is not None:
+        sql += " AND v.created_at < ?"
+        params.append(until)
+    sql += " GROUP BY m.name ORDER BY m.name"
+
+    conn = connect(path)
+    try:
+        return {row["name"]: (row["average"], row["videos"]) for row in conn.execute(sql, params)}
+    finally:
+        conn.close()
+
+
+def get_timeline(video_id, path=RESULTS_DB_PATH):
+    conn = connect(path)
+    try:
+        rows = conn.execute(
+            "SELECT start, end, kind, text FROM timeline WHERE video_id = ? ORDER BY start", (video_id,))
+        return [dict(row) for row in rows]
+    finally:
+        conn.close()
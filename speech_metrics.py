@@ -0,0 +1,135 @@
+import re
+from collections import Counter
+
+import numpy as np
+from analyzers import Analyzer, TRANSCRIPT
+
+LONG_PAUSE_SECONDS = 1.5
+REPETITION_WINDOW = 50  # key words per window of the repetition score
+
+FILLER_WORDS = {"um", "umm", "uh", "uhh", "uhm", "erm", "er", "ah", "eh", "hmm", "mm"}
+FILLER_PHRASES = [("you", "know"), ("i", "mean")]
+
+# Often fillers but just as often content ("I like this", "this kind of model"); reported
+# separately as possible fillers and not graded
+POSSIBLE_FILLER_WORDS = {"like"}
+POSSIBLE_FILLER_PHRASES = [("sort", "of"), ("kind", "of")]
+
+# Short function words are excluded from the repetition score, the rubric
+# only cares about repeated key words
+STOP_WORDS = {
+    "a", "an", "the", "and", "or", "but", "so", "to", "of", "in", "on", "at", "for", "with",
+    "is", "are", "was", "were", "be", "been", "it", "this", "that", "i", "you", "we", "they",
+    "he", "she", "my", "our", "your", "their", "as", "by", "from", "not", "do", "have", "has",
+}
+
+
+def normalize_word(text):
+    return re.sub(r"[^\w']+", "", text.lower())
+
+
+def extract_words(transcription_result):
+    # Flatten whisper_timestamped segments into a single list of timed words
+    words = []
+    for segment in transcription_result.get("segments", []):
+        for word in segment.get("words", []):
+            token = normalize_word(word["text"])
+            if not token:
+                continue
+            words.append({"text": token, "start": float(word["start"]), "end": float(word["end"])})
+    return words
+
+
+def count_fillers(tokens, words=FILLER_WORDS, phrases=FILLER_PHRASES):
+    counts = Counter(token for token in tokens if token in words)
+    for first, second in phrases:
+        hits = sum(1 for a, b in zip(tokens, tokens[1:]) if a == first and b == second)
+        if hits:
+            counts[f"{first} {second}"] = hits
+    return dict(counts)
+
+
+def windowed_repetition(key_words, window=REPETITION_WINDOW):
+    # Share of repeated key words within each run of `window` key words, averaged over
+    # the talk (a moving-average type/token ratio), so a long talk doesn't score higher
+    # just because it is long
+    if len(key_words) <= window:
+        return (len(key_words) - len(set(key_words))) / len(key_words)
+    counts = Counter(key_words[:window])
+    unique_counts = [len(counts)]
+    for old, new in zip(key_words, key_words[window:]):
+        counts[new] += 1
+        counts[old] -= 1
+        if counts[old] == 0:
+            del counts[old]
+        unique_counts.append(len(counts))
+    return 1 - np.mean(unique_counts) / window
+
+
+def calculate_speech_metrics(words, long_pause_seconds: float = LONG_PAUSE_SECONDS) -> dict:
+    if len(words) == 0:
+        return {
+            "word_count": 0,
+            "speaking_duration_sec": 0.0,
+            "speech_rate_wpm": 0.0,
+            "long_pause_count": 0,
+            "longest_pause_sec": 0.0,
+            "mean_pause_sec": 0.0,
+            "filler_word_count": 0,
+            "filler_words": {},
+            "possible_filler_count": 0,
+            "possible_fillers": {},
+            "stumble_count": 0,
+            "word_repetition_percentage": 0.0,
+        }
+
+    tokens = [word["text"] for word in words]
+    starts = np.fromiter((word["start"] for word in words), dtype=np.float64, count=len(words))
+    ends = np.fromiter((word["end"] for word in words), dtype=np.float64, count=len(words))
+
+    duration = max(float(ends[-1] - starts[0]), 0.0)
+    speech_rate = (len(words) / duration) * 60 if duration > 0 else 0.0
+
+    # Silence between the end of one word and the start of the next
+    gaps = np.clip(starts[1:] - ends[:-1], 0.0, None)
+    long_pauses = gaps[gaps > long_pause_seconds]
+
+    fillers = count_fillers(tokens)
+    possible_fillers = count_fillers(tokens, POSSIBLE_FILLER_WORDS, POSSIBLE_FILLER_PHRASES)
+
+    # Immediate repeats ("I I think") are counted as stumbles
+    token_array = np.array(tokens)
+    stumble_count = int(np.count_nonzero(token_array[1:] == token_array[:-1]))
+
+    key_words = token_array[~np.isin(token_array, list(STOP_WORDS | FILLER_WORDS | POSSIBLE_FILLER_WORDS))]
+    if key_words.size:
+        repetition = windowed_repetition(key_words.tolist()) * 100
+    else:
+        repetition = 0.0
+
+    return {
+        "word_count": len(words),
+        "speaking_duration_sec": round(duration, 2),
+        "speech_rate_wpm": round(speech_rate, 1),
+        "long_pause_count": int(long_pauses.size),
+        "longest_pause_sec": round(float(gaps.max()), 2) if gaps.size else 0.0,
+        "mean_pause_sec": round(float(gaps.mean()), 2) if gaps.size else 0.0,
+        "filler_word_count": int(sum(fillers.values())),
+        "filler_words": fillers,
+        "possible_filler_count": int(sum(possible_fillers.values())),
+        "possible_fillers": possible_fillers,
+        "stumble_count": stumble_count,
+        "word_repetition_percentage": round(float(repetition), 2),
+    }
+
+
+class SpeechMetricsAnalyzer(Analyzer):
+    name = "speech_metrics"
+    result_key = "speech_metrics"
+    inputs = (TRANSCRIPT,)
+
+    def __init__(self, long_pause_seconds: float = LONG_PAUSE_SECONDS):
+        self.long_pause_seconds = long_pause_seconds
+
+    def finalize(self, context):
+        return calculate_speech_metrics(extract_words(context["transcription"]), self.long_pause_seconds)
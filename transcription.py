@@ -0,0 +1,171 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+import numpy as np
+from analyzers import check_cancelled, report_progress, wait_with_progress
+from resource_manager import CONCURRENT_STAGES, configure_frameworks, threads_per_stage
+
+SAMPLE_RATE = 16000  # Whisper works on 16kHz mono audio
+
+BACKENDS = ["whisper_timestamped", "faster_whisper"]
+MODEL_SIZES = ["tiny", "base", "small"]
+
+
+def env_choice(name, choices, default):
+    # A typo in the environment shouldn't take the whole page down
+    value = os.getenv(name, default)
+    if value not in choices:
+        print(f"[WARNING] {name}={value!r} is not one of {choices}; using {default!r}.")
+        return default
+    return value
+
+
+TRANSCRIBE_BACKEND = env_choice("TRANSCRIBE_BACKEND", BACKENDS, "whisper_timestamped")
+WHISPER_MODEL_SIZE = env_choice("WHISPER_MODEL_SIZE", MODEL_SIZES, "base")
+TRANSCRIBE_WORKERS = int(os.getenv("TRANSCRIBE_WORKERS", "2"))
+
+CHUNK_SECONDS = 120
+BOUNDARY_SEARCH_SECONDS = 2.0
+
+# A chunk from an interrupted run can still be running on the cached model
+whisper_timestamped_lock = threading.Lock()
+
+
+@lru_cache(maxsize=None)
+def load_model(backend, model_size, workers=1):
+    if backend == "whisper_timestamped":
+        import whisper_timestamped as whisper
+        return whisper.load_model(model_size)
+    if backend == "faster_whisper":
+        # CTranslate2 backend with int8 weights, much faster than fp32 PyTorch on CPU
+        try:
+            from faster_whisper import WhisperModel
+        except ImportError as e:
+            raise ImportError("The faster_whisper backend needs the 'faster-whisper' package installed.") from e
+        # Each parallel chunk gets its share of the cores instead of all of them
+        cpu_threads = threads_per_stage(CONCURRENT_STAGES * workers)
+        return WhisperModel(model_size, device="cpu", compute_type="int8", cpu_threads=cpu_threads,
+                            num_workers=workers)
+    raise ValueError(f"Unknown transcription backend '{backend}'. Choose one of {BACKENDS}.")
+
+
+def extract_audio(video_path, audio_path):
+    from moviepy import VideoFileClip
+    video = VideoFileClip(video_path)
+    video.audio.write_audiofile(audio_path)
+    video.close()
+    return audio_path
+
+
+def split_audio(audio, chunk_seconds=CHUNK_SECONDS):
+    # Cut at the quietest 20ms frame near each boundary so we don't split a word in half
+    chunk_len = int(chunk_seconds * SAMPLE_RATE)
+    search_len = int(BOUNDARY_SEARCH_SECONDS * SAMPLE_RATE)
+    frame_len = SAMPLE_RATE // 50
+
+    chunks = []
+    start = 0
+    while len(audio) - start > chunk_len:
+        window_start = start + chunk_len - search_len
+        window = audio[window_start:start + chunk_len]
+        n_frames = len(window) // frame_len
+        energy = np.square(window[:n_frames * frame_len].reshape(n_frames, frame_len)).mean(axis=1)
+        cut = window_start + int(np.argmin(energy)) * frame_len
+        chunks.append((start, audio[start:cut]))
+        start = cut
+    chunks.append((start, audio[start:]))
+    return chunks
+
+
+def transcribe_chunk_whisper_timestamped(model, audio):
+    import whisper_timestamped as whisper
+    with whisper_timestamped_lock:
+        result = whisper.transcribe(model, audio)
+    segments = []
+    for segment in result["segments"]:
+        segments.append({
+            "start": segment["start"],
+            "end": segment["end"],
+            "text": segment["text"],
+            "words": [
+                {"text": w["text"], "start": w["start"], "end": w["end"], "confidence": w.get("confidence", 0.0)}
+                for w in segment.get("words", [])
+            ],
+        })
+    return segments
+
+
+def transcribe_chunk_faster_whisper(model, audio):
+    raw_segments, _ = model.transcribe(audio, word_timestamps=True)
+    segments = []
+    for segment in raw_segments:
+        segments.append({
+            "start": segment.start,
+            "end": segment.end,
+            "text": segment.text,
+            "words": [
+                {"text": w.word, "start": w.start, "end": w.end, "confidence": w.probability}
+                for w in (segment.words or [])
+            ],
+        })
+    return segments
+
+
+def shift_segments(segments, offset):
+    for segment in segments:
+        segment["start"] += offset
+        segment["end"] += offset
+        for word in segment["words"]:
+            word["start"] += offset
+            word["end"] += offset
+    return segments
+
+
+def transcribe_audio(audio_path, backend=TRANSCRIBE_BACKEND, model_size=WHISPER_MODEL_SIZE,
+                     workers=TRANSCRIBE_WORKERS, chunk_seconds=CHUNK_SECONDS, progress_callback=None,
+                     cancel_token=None):
+    # Returns {"segments": [...]} in the whisper_timestamped layout regardless of backend
+    if model_size not in MODEL_SIZES:
+        raise ValueError(f"Unknown model size '{model_size}'. Choose one of {MODEL_SIZES}.")
+
+    import librosa
+    audio, _ = librosa.load(audio_path, sr=SAMPLE_RATE)
+    audio = audio.astype(np.float32)
+
+    chunks = split_audio(audio, chunk_seconds)
+
+    if backend == "faster_whisper":
+        # CTranslate2 releases the GIL, so chunks can run in parallel on one shared model
+        model = load_model(backend, model_size, workers)
+        transcribe_chunk = transcribe_chunk_faster_whisper
+    else:
+        # whisper_timestamped hooks into the model's attention layers while it runs,
+        # so one model instance can't be shared across threads
+        model = load_model(backend, model_size)
+        transcribe_chunk = transcribe_chunk_whisper_timestamped
+        workers = 1
+        configure_frameworks()
+
+    def run(chunk):
+        # Chunks that haven't started yet are skipped once the run is cancelled
+        check_cancelled(cancel_token)
+        offset, samples = chunk
+        return shift_segments(transcribe_chunk(model, samples), offset / SAMPLE_RATE)
+
+    # Chunks run on helper threads; progress is always reported from the calling thread,
+    # and keeps being reported while a chunk is in flight
+    results = []
+    pool = ThreadPoolExecutor(max_workers=workers)
+    try:
+        futures = [pool.submit(run, chunk) for chunk in chunks]
+        for future in futures:
+            results.append(wait_with_progress(
+                future, progress_callback, "transcription", len(results), len(chunks), cancel_token))
+    finally:
+        # Don't hold an interrupted run on the chunk that is still running
+        pool.shutdown(wait=False, cancel_futures=True)
+    report_progress(progress_callback, "transcription", len(results), len(chunks))
+
+    return {"segments": [segment for chunk_segments in results for segment in chunk_segments]}
@@ -0,0 +1,42 @@
+import importlib
+import os
+import threading
+import time
+
+# Heavy frameworks the analyzers import on first use, in the order the app needs them
+HEAVY_MODULES = [
+    "cv2",
+    "librosa",
+    "mediapipe",
+    "deepface.DeepFace",
+    "crepe",
+]
+
+PREWARM = os.getenv("PREWARM", "1") == "1"
+
+_prewarm_thread = None
+_prewarm_lock = threading.Lock()
+import_times = {}
+
+
+def prewarm(modules=HEAVY_MODULES):
+    for name in modules:
+        start = time.perf_counter()
+        try:
+            importlib.import_module(name)
+        except Exception as e:
+            print(f"[WARNING] Pre-warm import of {name} failed: {e}")
+            continue
+        import_times[name] = time.perf_counter() - start
+        print(f"[DEBUG] Pre-warmed {name} in {import_times[name]:.2f}s")
+
+
+def start_prewarm(modules=HEAVY_MODULES):
+    # Import the heavy frameworks on a background thread while the UI renders. An
+    # analyzer that needs a module first simply waits on Python's import lock.
+    global _prewarm_thread
+    with _prewarm_lock:
+        if _prewarm_thread is None:
+            _prewarm_thread = threading.Thread(target=prewarm, args=(modules,), name="prewarm", daemon=True)
+            _prewarm_thread.start()
+    return _prewarm_thread